@@ -2,6 +2,14 @@
 """
 This is the pyTurbSim 'executable script', which utilizes the
 :mod:`pyts.runConfig` package.
+
+Usage::
+
+    pyTurbSim.py [input_file.inp]
+    pyTurbSim.py batch inputs/*.inp [-j NPROC] [--log LOGFILE]
+
+The second form runs many input files in parallel (see
+:mod:`pyts.runInput.batch`).
 """
 
 import sys
@@ -9,6 +17,10 @@ from pyts.runInput.main import readInput, run, write
 import time
 
 
+if len(sys.argv) > 1 and sys.argv[1] == 'batch':
+    from pyts.runInput.batch import main
+    sys.exit(main(sys.argv[2:]))
+
 if len(sys.argv) > 1:
     fname = sys.argv[1]
 else:
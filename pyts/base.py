@@ -14,8 +14,9 @@ This module:
 
 """
 from . import pyts_numpy as np
-from numpy import float32, complex64
+from numpy import float32, complex64, asarray, broadcast_to, result_type
 from .misc import lowPrimeFact_near
+from .fftlib import fast_nt
 from os import path
 try:
     from .tslib import tslib  # The file tslib.so contains the module 'tslib'.
@@ -72,6 +73,130 @@ class tsBaseObj(object):
     comp = range(n_comp)
 
 
+class lazyArray(object):
+
+    """
+    An abstract base class for 'lazy' arrays, whose values are only
+    computed (or read) when they are indexed.
+
+    Indexing a lazy array (e.g. a time-slice, a grid-point or a
+    component) only computes that part of it. Any other use of it
+    (arithmetic, numpy functions or ndarray methods) computes the full
+    array, unless it has been cached (see :meth:`cache`).
+
+    Derived classes define `shape`, `dtype` and `_getitem`.
+    """
+    _cached = None
+
+    @property
+    def ndim(self,):
+        return len(self.shape)
+
+    @property
+    def size(self,):
+        out = 1
+        for n in self.shape:
+            out *= n
+        return out
+
+    def __len__(self,):
+        return self.shape[0]
+
+    def __getitem__(self, ind):
+        if isinstance(ind, list) and any(isinstance(i, slice) for i in ind):
+            # A list of slices is a multidimensional index.
+            ind = tuple(ind)
+        if self._cached is not None:
+            return self._cached[ind]
+        return self._getitem(ind)
+
+    def __array__(self, dtype=None):
+        out = self[...]
+        if dtype is not None:
+            out = out.astype(dtype)
+        return out
+
+    def __getattr__(self, name):
+        # Delegate ndarray methods (e.g. mean, std, flatten) to the
+        # full array. Other names are not computed (e.g. hasattr
+        # does not load the array).
+        if name.startswith('_') or not hasattr(np.ndarray, name):
+            raise AttributeError(name)
+        return getattr(self[...], name)
+
+    def cache(self,):
+        """
+        Compute the full array and keep it, so that later uses do
+        not recompute it (until :meth:`release` is called).
+
+        Returns this object.
+        """
+        if self._cached is None:
+            self._cached = self._getitem(Ellipsis)
+        return self
+
+    def release(self,):
+        """
+        Release the cached array (see :meth:`cache`).
+        """
+        self._cached = None
+
+
+def _arith(name):
+    def op(self, *args):
+        return getattr(self[...], name)(*args)
+    op.__name__ = name
+    return op
+
+for _nm in ['add', 'sub', 'mul', 'div', 'truediv', 'floordiv',
+            'mod', 'pow']:
+    for _pre in ['__', '__r']:
+        setattr(lazyArray, _pre + _nm + '__', _arith(_pre + _nm + '__'))
+for _nm in ['__neg__', '__pos__', '__abs__',
+            '__lt__', '__le__', '__gt__', '__ge__', '__eq__', '__ne__']:
+    setattr(lazyArray, _nm, _arith(_nm))
+del _nm, _pre
+
+
+class totalArray(lazyArray):
+
+    """
+    The lazy total (mean + turbulent) velocity, ``uturb + uprof``,
+    where `uprof` is constant in time.
+
+    Parameters
+    ----------
+    uturb : array_like (3 x n_z x n_y x n_t)
+            The turbulent velocity (an array or :class:`lazyArray`).
+    uprof : array_like (3 x n_z x n_y)
+            The mean velocity.
+    comp :  int, optional (None)
+            If this is specified, the array is only of that component.
+    """
+
+    def __init__(self, uturb, uprof, comp=None):
+        self.uturb = uturb
+        self.uprof = broadcast_to(asarray(uprof)[..., None], uturb.shape)
+        self._prefix = () if comp is None else (comp, )
+
+    @property
+    def shape(self,):
+        return self.uturb.shape[len(self._prefix):]
+
+    @property
+    def dtype(self,):
+        return result_type(self.uturb.dtype, self.uprof.dtype)
+
+    def __repr__(self,):
+        return '<totalArray: shape %s>' % (self.shape, )
+
+    def _getitem(self, ind):
+        if not isinstance(ind, tuple):
+            ind = (ind, )
+        ind = self._prefix + ind
+        return self.uturb[ind] + self.uprof[ind]
+
+
 class calcObj(tsBaseObj):
 
     """
@@ -193,7 +318,7 @@ def tsGrid(center=None, ny=None, nz=None,
            width=None, height=None, dy=None, dz=None,
            nt=None, time_sec=None, time_min=None, dt=None, time_sec_out=None,
            findClose_nt_lowPrimeFactors=True, prime_max=31,
-           clockwise=True):
+           clockwise=True, fft=None):
     """
     Create a TurbSim grid.
 
@@ -227,6 +352,14 @@ def tsGrid(center=None, ny=None, nz=None,
     clockwise    : bool, optional (True)
         Should the simulation write a 'clockwise' rotation output file.
         This is only used when writing 'Bladed' output files.
+    fft          : str, optional (None)
+        An FFT backend name (see :mod:`pyts.fftlib`). If this is
+        specified (and `findClose_nt_lowPrimeFactors` is True), the
+        number of timesteps is the size near `nt` with the fastest
+        measured transform time for that backend (see
+        :func:`fast_nt <pyts.fftlib.fast_nt>`), rather than the
+        nearest low-prime size. Note that the result can depend on
+        the machine.
 
     Notes
     -----
@@ -266,7 +399,10 @@ def tsGrid(center=None, ny=None, nz=None,
                            dt, plus_one=0)
 
     if findClose_nt_lowPrimeFactors:
-        out.n_t = lowPrimeFact_near(out.n_t, nmin=out.n_t_out, pmax=prime_max)
+        if fft is None:
+            out.n_t = lowPrimeFact_near(out.n_t, nmin=out.n_t_out, pmax=prime_max)
+        else:
+            out.n_t = fast_nt(out.n_t, nmin=out.n_t_out, fft=fft, pmax=prime_max)
         out.n_t, out.time_sec, junk = _parse_inputs(
             out.n_t, None, out.dt, plus_one=0)
     out.f = np.arange(out.n_f, dtype=ts_float) * out.df + out.df  # !!!CHECKTHIS
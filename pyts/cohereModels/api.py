@@ -46,8 +46,13 @@ Available coherence models
 Further details on creating your own coherence model, can be found in
 :mod:`pyts.cohereModels.base` documentation.
 
+:class:`~.cache.factorCache`
+  A cache of coherence-matrix factors, for reuse between runs that
+  differ only in their random seed.
+
 """
 from .base import cohereObj, cohereModelBase
+from .cache import factorCache
 import main
 
 iec = main.iec
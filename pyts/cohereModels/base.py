@@ -16,8 +16,10 @@ the grid.
 
 """
 # tslib and dbg are needed externally
-from ..base import gridProps, modelBase, np, ts_float, ts_complex, calcObj
-from numpy.linalg import cholesky
+from ..base import gridProps, modelBase, np, ts_float, ts_complex, calcObj, tslib
+from numpy.linalg import cholesky, eigh, qr, LinAlgError
+from numpy.random import RandomState
+from warnings import warn
 
 
 class cohereObj(gridProps, calcObj):
@@ -44,6 +46,27 @@ class cohereObj(gridProps, calcObj):
 
     """
 
+    # The maximum size (in bytes) of the block of coherence matrices
+    # that is held in memory at one time by the numpy implementation
+    # of :meth:`calc_phases` (i.e. when tslib is not available).
+    blocksize_bytes = 2 ** 26
+    # The coherence-factor cache (see :class:`.cache.factorCache`).
+    cache = None
+    # The velocity components that are correlated by this object.
+    _corr_comps = (0, 1, 2)
+    # The coherence below which the coherence matrix is treated as
+    # the identity matrix (see :meth:`_n_corr`). None disables this.
+    coh_tol = None
+    # The method used to factor the coherence matrices: 'dense'
+    # (Cholesky) or 'lowrank' (truncated eigen-decomposition, see
+    # :meth:`_lowrank_phases`), and the relative (Frobenius-norm)
+    # error of the coherence matrices reproduced by 'lowrank'.
+    method = 'dense'
+    lowrank_tol = 1e-2
+    # The number of oversampling columns of the randomized range
+    # finder of the 'lowrank' method.
+    _lowrank_oversample = 8
+
     @property
     def array(self,):
         """
@@ -62,12 +85,10 @@ class cohereObj(gridProps, calcObj):
                                     self.n_p,
                                     self.n_p,
                                     self.n_f),
-                                   dtype=ts_complex, order='F')
-
+                                   dtype=ts_float, order='F')
             for icomp in range(3):
-                for ff in range(self.n_f):
-                    for ii, jj in self._iter_inds():
-                        self._array[icomp, ii, jj] = self._array[icomp, jj, ii] = self.calcCoh(self.grid.f, icomp, ii, jj)  # nopep8
+                self._array[icomp] = np.rollaxis(
+                    self.calcCohMat(self.grid.f, icomp), 0, 3)
         return self._array
 
     @array.setter
@@ -84,6 +105,20 @@ class cohereObj(gridProps, calcObj):
         self.spec = tsrun.spec
         self.stress = tsrun.stress
         self.ncore = tsrun.ncore  # This is used by tslib.
+        self.parallel = tsrun.parallel
+        self.cache = tsrun.cohere_cache
+        # The run's RandSeed and stream segment are used by methods
+        # that draw random numbers.
+        self._run = tsrun
+
+    @property
+    def _parf(self,):
+        """
+        The `parf` argument of the tslib coherence kernels: 1 to
+        distribute the frequencies across threads, 0 to process them
+        one at a time (with a threaded BLAS).
+        """
+        return int(self.parallel != 'blas')
 
     def _iter_inds(self,):
         """
@@ -94,7 +129,77 @@ class cohereObj(gridProps, calcObj):
             for ii in range(jj, self.n_p):
                 yield ii, jj
 
-    def calc_phases(self, phases):
+    def _iter_fblocks(self, n_f):
+        """
+        An iterator of slices that break a frequency vector of length
+        `n_f` into blocks that fit within :attr:`blocksize_bytes`.
+        """
+        nblk = max(int(self.blocksize_bytes //
+                       (8 * self.n_p ** 2)), 1)
+        for i0 in range(0, n_f, nblk):
+            yield slice(i0, min(i0 + nblk, n_f))
+
+    @property
+    def _tril_inds(self,):
+        """
+        The (ii, jj) indices of the lower-triangular elements of an
+        (n_p x n_p) matrix, in LAPACK's packed (column) order.
+        """
+        if not hasattr(self, '_val_tril_inds'):
+            jj, ii = np.triu_indices(self.n_p)
+            self._val_tril_inds = (ii, jj)
+        return self._val_tril_inds
+
+    @property
+    def _zz(self,):
+        """
+        The height of each point in the (flattened) grid.
+        """
+        return self.grid.flatten(np.tile(self.grid.z[:, None],
+                                         (1, self.n_y)))
+
+    @property
+    def _yy(self,):
+        """
+        The lateral position of each point in the (flattened) grid.
+        """
+        return self.grid.flatten(np.tile(self.grid.y[None, :],
+                                         (self.n_z, 1)))
+
+    @property
+    def _r(self,):
+        """
+        The (n_p x n_p) matrix of distances between grid points.
+        """
+        if not hasattr(self, '_val_r'):
+            zz, yy = self._zz, self._yy
+            self._val_r = np.sqrt((zz[:, None] - zz[None, :]) ** 2 +
+                                  (yy[:, None] - yy[None, :]) ** 2)
+        return self._val_r
+
+    @property
+    def _zm(self,):
+        """
+        The (n_p x n_p) matrix of the mean height of each grid-point
+        pair.
+        """
+        if not hasattr(self, '_val_zm'):
+            zz = self._zz
+            self._val_zm = (zz[:, None] + zz[None, :]) / ts_float(2)
+        return self._val_zm
+
+    @property
+    def _um(self,):
+        """
+        The (n_p x n_p) matrix of the mean u-component velocity of
+        each grid-point pair.
+        """
+        if not hasattr(self, '_val_um'):
+            uu = self.grid.flatten(self.prof.u)
+            self._val_um = (uu[:, None] + uu[None, :]) / ts_float(2)
+        return self._val_um
+
+    def calc_phases(self, phases, ifreq=slice(None)):
         """
         Compute the `correlated phases` for each grid-point from the
         input `phases` based on the coherence function of this
@@ -102,15 +207,19 @@ class cohereObj(gridProps, calcObj):
 
         Parameters
         ----------
-        phases : array_like(np,nf)
+        phases : array_like(3,np,nf)
                  The input (generally randomized) phases for each
                  point for each frequency.
+        ifreq : slice, optional
+                The frequencies (indices into grid.f) that `phases`
+                correspond to. By default `phases` contains all
+                frequencies.
 
         Returns
         -------
-        phases : array_like(np,nf)
+        phases : array_like(3,np,nf)
                  The correlated phases according to this cohereObj's
-                 coherence model (see :meth:`calcCoh`).
+                 coherence model (see :meth:`calcCohMat`).
 
         Notes
         -----
@@ -118,29 +227,464 @@ class cohereObj(gridProps, calcObj):
         This method should not be called explicitly.  It is called by
         a cohereObj instance's __call__ method.
 
-        This routine utilizes a model's 'calcCoh' method, which must
-        be defined explicitly for all sub-classes of this class.
+        This routine utilizes the object's :meth:`calcCohMat` method,
+        which by default is computed from the 'calcCoh' method. One
+        of these must be defined explicitly for all sub-classes of
+        this class.
 
         See also
         --------
         calcCoh : computes the coherence for individual grid-point pairs.
+        calcCohMat : computes the coherence matrix for a block of frequencies.
+
+        """
+        f = self.grid.f[ifreq]
+        for comps in self._comp_groups():
+            n = self._n_corr(comps[0], f)
+            if not n:
+                continue
+            if len(comps) > 1:
+                self._corr_phases_group(phases, comps, f[:n])
+            else:
+                phases[comps[0]][:, :n] = self._corr_phases(
+                    phases[comps[0]][:, :n], comps[0], f[:n])
+        return phases
+
+    def calc_phases_multi(self, phases, ifreq=slice(None), seeds=None):
+        """
+        Compute the `correlated phases` for several realizations
+        (e.g. random seeds) at once.
+
+        Parameters
+        ----------
+        phases : array_like(n_s,3,np,nf)
+                 The input (generally randomized) phases of each of
+                 the n_s realizations.
+        ifreq : slice, optional
+                The frequencies (indices into grid.f) that `phases`
+                correspond to.
+        seeds : list, optional
+                The RandSeed of each realization. This is used by
+                methods that draw random numbers (e.g. the IEC
+                'circulant' method), so that each realization matches
+                a separate run with that seed.
+
+        Returns
+        -------
+        phases : array_like(n_s,3,np,nf)
+                 The correlated phases.
+
+        Notes
+        -----
+
+        The coherence matrix at each frequency is factored only once,
+        and the factor is applied to all realizations as a single
+        matrix-matrix product.
+
+        """
+        if self.method == 'lowrank':
+            for isd in range(phases.shape[0]):
+                self.calc_phases(phases[isd], ifreq)
+            return phases
+        f = self.grid.f[ifreq]
+        for comps in self._comp_groups():
+            n = self._n_corr(comps[0], f)
+            if not n:
+                continue
+            fct = self._factors(comps[0], f[:n])
+            for icomp in comps:
+                phases[:, icomp, :, :n] = self._apply_factors_multi(
+                    fct, phases[:, icomp, :, :n])
+        return phases
+
+    def _comp_groups(self,):
+        """
+        The components of :attr:`_corr_comps`, grouped by their
+        coherence function: the components in each group (a tuple)
+        have identical coherence matrices (identical
+        :meth:`_cache_params`), so that their phases can be
+        correlated by the same factors.
+        """
+        out = []
+        params = []
+        for comp in self._corr_comps:
+            prm = self._cache_params(comp)
+            if prm is not None and prm in params:
+                ind = params.index(prm)
+                out[ind] = out[ind] + (comp, )
+            else:
+                out.append((comp, ))
+                params.append(prm)
+        return out
+
+    def _corr_phases_group(self, phases, comps, f):
+        """
+        Correlate the phases of the components `comps` (which have
+        identical coherence, see :meth:`_comp_groups`) at
+        frequencies `f` (the first len(`f`) columns of
+        ``phases[comp]``), in place.
+
+        The factors of each block of frequencies are computed once,
+        and applied to the phases of each component.
+        """
+        if self.method == 'lowrank':
+            out = self._lowrank_phases(
+                [phases[comp][:, :len(f)] for comp in comps], comps, f)
+            for comp, phr in zip(comps, out):
+                phases[comp][:, :len(f)] = phr
+            return
+        for ifs in self._iter_fblocks(len(f)):
+            fct = self._factors(comps[0], f[ifs])
+            for comp in comps:
+                phases[comp][:, ifs] = self._apply_factors(
+                    fct, phases[comp][:, ifs], comp, f[ifs])
+
+    def _f_cut(self, comp):
+        """
+        The frequency above which the coherence of component `comp`
+        is less than :attr:`coh_tol` for every pair of points (so that
+        the coherence matrix is effectively the identity matrix).
+
+        The default (None) is that there is no such frequency.
+        Sub-classes whose coherence decays with frequency should
+        override this.
+        """
+        return None
+
+    def _f_cut_decay(self, K, um, b):
+        """
+        The frequency above which coherence of the form::
+
+            exp(-K * sqrt((f / um) ** 2 + b ** 2))
 
+        is less than :attr:`coh_tol`. `K` and `um` are functions
+        ``K(ii, jj)`` and ``um(ii, jj)`` that return the coefficients
+        of point `ii` and points `jj` (``jj > ii``).
         """
-        out = np.zeros((self.n_comp, self.n_p, self.n_f),
-                       dtype=ts_complex, order='F')
-        tmp = np.empty((self.n_p, self.n_p),
-                       dtype=ts_float, order='F')
-        for icomp in range(3):
-            for ff in range(self.n_f):
-                for ii, jj in self._iter_inds():
-                    if ii == jj:
-                        tmp[ii, ii] = 1
+        lt = -np.log(self.coh_tol)
+        out = 0.
+        for ii in range(self.n_p - 1):
+            jj = np.arange(ii + 1, self.n_p)
+            k = K(ii, jj)
+            if (k <= 0).any():
+                # Points with zero 'distance' are fully coherent.
+                return float('inf')
+            fc = np.abs(um(ii, jj)) * np.sqrt(
+                np.maximum((lt / k) ** 2 - b ** 2, 0))
+            out = max(out, fc.max())
+        return out
+
+    def _n_corr(self, comp, f):
+        """
+        The number of (leading) frequencies of the increasing
+        frequency vector `f` at which the phases of component `comp`
+        need to be correlated. At frequencies above :meth:`_f_cut` the
+        coherence matrix is effectively the identity matrix, and the
+        phases are left unchanged.
+        """
+        if not self.coh_tol:
+            return len(f)
+        if not hasattr(self, '_val_f_cut'):
+            self._val_f_cut = {}
+        if comp not in self._val_f_cut:
+            self._val_f_cut[comp] = self._f_cut(comp)
+        if self._val_f_cut[comp] is None:
+            return len(f)
+        return int(np.searchsorted(f, self._val_f_cut[comp], 'right'))
+
+    def _corr_phases(self, phr, comp, f):
+        """
+        Correlate the phases, `phr` (np x nf), of velocity component
+        `comp` at frequencies `f`.
+
+        The coherence matrices are computed, and factored, for blocks
+        of frequencies at a time (see :attr:`blocksize_bytes`). If
+        this object has a :attr:`cache`, the factors are taken from
+        (or stored in) it.
+
+        If :attr:`method` is 'lowrank', the phases are correlated by
+        :meth:`_lowrank_phases` instead.
+        """
+        if self.method == 'lowrank':
+            return self._lowrank_phases([phr], (comp, ), f)[0]
+        if self.cache is not None and self._cache_params(comp) is not None:
+            return self._apply_factors(self._factors(comp, f), phr, comp, f)
+        out = np.empty_like(phr)
+        for ifs in self._iter_fblocks(len(f)):
+            fct = cholesky(self.calcCohMat(f[ifs], comp))
+            out[:, ifs] = np.einsum('fij,jf->if', fct, phr[:, ifs])
+        return out
+
+    def _lowrank_phases(self, phrs, comps, f):
+        """
+        Correlate the phases in the list `phrs` (each np x nf) of the
+        components `comps` (which have identical coherence) at
+        frequencies `f`, using a truncated eigen-decomposition of the
+        coherence matrix at each frequency.
+
+        At each frequency, the coherence matrix C is approximated by
+        its k largest eigen-modes, C_k = U diag(lam) U^T, where k is
+        the smallest rank for which ||C - C_k|| <= lowrank_tol * ||C||
+        (Frobenius norm). The phases are multiplied by the symmetric
+        square-root of C_k, U diag(sqrt(lam)) U^T, so that their
+        cross-spectral matrix is C_k.
+
+        The modes are found by a randomized range finder (O(np^2 k)).
+        When the rank is more than half of np a low-rank factor is no
+        cheaper, and the Cholesky factor of C is used instead (or the
+        full eigen-decomposition, if C is not numerically positive
+        definite). Unlike the Cholesky factorization, this does not
+        fail when C is (numerically) rank-deficient. The rank used at
+        each frequency is stored in :attr:`ranks`.
+        """
+        out = [np.empty_like(phr) for phr in phrs]
+        rng = RandomState(0)
+        ranks = np.zeros(len(f), dtype=int)
+        k = 1
+        for ifs in self._iter_fblocks(len(f)):
+            coh = self.calcCohMat(f[ifs], comps[0])
+            for idx, c in enumerate(coh):
+                iff = ifs.start + idx
+                u, sq = self._lowrank_factor(c.astype('f8'), k, rng)
+                ranks[iff] = k = u.shape[1]
+                for phr, o in zip(phrs, out):
+                    if sq is None:
+                        o[:, iff] = u.dot(phr[:, iff])
                     else:
-                        tmp[ii, jj] = tmp[jj, ii] = self.calcCoh(
-                            self.grid.f[ff],
-                            icomp, ii, jj)
-                tmp[:] = cholesky(tmp)
-                out[icomp, :, ff] = (tmp * phases[icomp, :, ff]).sum(-1)
+                        o[:, iff] = u.dot(sq * u.T.dot(phr[:, iff]))
+        if not hasattr(self, 'ranks'):
+            self.ranks = {}
+        ind = np.searchsorted(self.grid.f, f)
+        for comp in comps:
+            if comp not in self.ranks:
+                self.ranks[comp] = np.zeros(self.n_f, dtype=int)
+            self.ranks[comp][ind] = ranks
+        return out
+
+    def _lowrank_factor(self, c, k, rng):
+        """
+        Return the eigen-vectors (np x k) and the square-root of the
+        eigen-values (k) of the truncated eigen-decomposition of the
+        coherence matrix `c` (see :meth:`_lowrank_phases`). `k` is
+        the initial guess of the rank, and `rng` is the
+        :class:`RandomState` of the range finder.
+
+        If the rank is more than half of np, the Cholesky factor of
+        `c` and None are returned.
+        """
+        n_p = len(c)
+        nrm2 = (c ** 2).sum()
+        while True:
+            m = k + self._lowrank_oversample
+            full = 2 * m >= n_p
+            if full:
+                try:
+                    return cholesky(c), None
+                except LinAlgError:
+                    lam, u = eigh(c)
+            else:
+                # Randomized range finder, with one power iteration.
+                q = qr(c.dot(c.dot(rng.standard_normal((n_p, m)))))[0]
+                lam, u = eigh(q.T.dot(c).dot(q))
+                u = q.dot(u)
+            lam = lam[::-1].clip(0)
+            err2 = nrm2 - np.cumsum(lam ** 2)
+            ok = np.nonzero(err2 <= (self.lowrank_tol ** 2) * nrm2)[0]
+            if len(ok):
+                k = ok[0] + 1
+                break
+            if full:
+                k = max(np.nonzero(lam)[0][-1] + 1, 1)
+                break
+            k *= 2
+        return u[:, ::-1][:, :k], np.sqrt(lam[:k])
+
+    def _fix_phases(self, phr, stat, comp, f):
+        """
+        Correlate the phases `phr` (np x nf) of component `comp` at
+        the frequencies (of `f`) at which the tslib factorization of
+        the coherence matrix failed (``stat != 0``). tslib leaves the
+        phases at those frequencies unchanged, and they are
+        correlated here using an eigen-decomposition of the coherence
+        matrix instead (see :meth:`_eig_phases`).
+        """
+        bad = np.nonzero(stat)[0]
+        if len(bad):
+            warn("The Cholesky factorization of the coherence matrix of "
+                 "component %d failed at %d frequencies (e.g. %0.4g Hz); "
+                 "an eigen-decomposition was used at those frequencies."
+                 % (comp, len(bad), f[bad[0]]))
+            phr[:, bad] = self._eig_phases(phr[:, bad], comp, f[bad])
+        return phr
+
+    def _fix_factors(self, fct, stat, comp, f):
+        """
+        Recompute (in double precision) the packed Cholesky factors
+        `fct` (nf x np*(np+1)/2) of component `comp` at the
+        frequencies (of `f`) at which the tslib factorization failed
+        (``stat != 0``).
+
+        Raises
+        ------
+        LinAlgError : if the coherence matrix at those frequencies is
+                      not positive definite (the 'lowrank' method
+                      handles such matrices).
+        """
+        bad = np.nonzero(stat)[0]
+        if len(bad):
+            ii, jj = self._tril_inds
+            try:
+                fct[bad] = cholesky(
+                    self.calcCohMat(f[bad], comp).astype('f8'))[:, ii, jj]
+            except LinAlgError:
+                raise LinAlgError(
+                    "The coherence matrix of component %d is not positive "
+                    "definite at %d frequencies (e.g. %0.4g Hz). Use the "
+                    "'lowrank' coherence method."
+                    % (comp, len(bad), f[bad[0]]))
+        return fct
+
+    def _eig_phases(self, phr, comp, f):
+        """
+        Correlate the phases `phr` (np x nf) of component `comp` at
+        frequencies `f` using the symmetric square-root of the
+        coherence matrix (from its eigen-decomposition). Unlike the
+        Cholesky factorization, this does not fail when the coherence
+        matrix is (numerically) singular.
+        """
+        out = np.empty_like(phr)
+        for ifs in self._iter_fblocks(len(f)):
+            lam, u = eigh(self.calcCohMat(f[ifs], comp).astype('f8'))
+            x = np.einsum('fkj,kf->fj', u, phr[:, ifs])
+            x *= np.sqrt(lam.clip(0))
+            out[:, ifs] = np.einsum('fij,fj->if', u, x)
+        return out
+
+    def _cache_params(self, comp):
+        """
+        The coherence model parameters of component `comp`, for use
+        in the :attr:`cache` key.
+
+        Sub-classes that can be cached must return a tuple that
+        uniquely identifies their coherence function (other than the
+        grid, frequency and mean velocity profile). The default (None)
+        disables the cache.
+        """
+        return None
+
+    def _factors(self, comp, f):
+        """
+        Return the packed Cholesky factors (nf x np*(np+1)/2) of the
+        coherence matrix of component `comp` at frequencies `f`.
+
+        The factors are taken from the :attr:`cache` if they are
+        there, otherwise they are computed (and stored in the cache).
+        """
+        if self.cache is None or self._cache_params(comp) is None:
+            return self._calc_factors(comp, f)
+        key = self.cache.key(self.grid, f, self.grid.flatten(self.prof.u),
+                             self._cache_params(comp))
+        fct = self.cache.get(key)
+        if fct is None:
+            fct = self.cache.set(key, self._calc_factors(comp, f))
+        return fct
+
+    def _calc_factors(self, comp, f):
+        """
+        Compute the packed Cholesky factors of the coherence matrix of
+        component `comp` at frequencies `f`.
+        """
+        ii, jj = self._tril_inds
+        out = np.empty((len(f), len(ii)), dtype=ts_float)
+        for ifs in self._iter_fblocks(len(f)):
+            out[ifs] = cholesky(self.calcCohMat(f[ifs], comp))[:, ii, jj]
+        return out
+
+    def _apply_factors(self, fct, phr, comp, f):
+        """
+        Multiply the phases `phr` (np x nf) by the packed Cholesky
+        factors `fct` (nf x np*(np+1)/2) of component `comp` at
+        frequencies `f`.
+
+        If tslib is used, the factors at frequencies where the
+        product is not finite (e.g. a corrupted cache entry) are
+        recomputed (see :meth:`_fix_factors`).
+        """
+        if tslib is not None:
+            out = np.array(phr, order='F')
+            stat = tslib.packmult(out, fct.T, self.ncore)
+            bad = np.nonzero(stat)[0]
+            if len(bad):
+                warn("The coherence factors of component %d are not finite "
+                     "at %d frequencies (e.g. %0.4g Hz); they were "
+                     "recomputed at those frequencies."
+                     % (comp, len(bad), f[bad[0]]))
+                fct = self._fix_factors(np.array(fct[bad]), stat[bad],
+                                        comp, f[bad])
+                out[:, bad] = self._apply_factors_multi(
+                    fct, phr[None, :, bad])[0]
+            return out
+        ii, jj = self._tril_inds
+        out = np.empty_like(phr)
+        for ifs in self._iter_fblocks(fct.shape[0]):
+            tmp = np.zeros((ifs.stop - ifs.start, self.n_p, self.n_p),
+                           dtype=ts_float)
+            tmp[:, ii, jj] = fct[ifs]
+            out[:, ifs] = np.einsum('fij,jf->if', tmp, phr[:, ifs])
+        return out
+
+    def _apply_factors_multi(self, fct, phr):
+        """
+        Multiply the phases `phr` (n_s x np x nf) of n_s realizations
+        by the packed Cholesky factors `fct` (nf x np*(np+1)/2).
+        """
+        ii, jj = self._tril_inds
+        out = np.empty_like(phr)
+        for ifs in self._iter_fblocks(fct.shape[0]):
+            tmp = np.zeros((ifs.stop - ifs.start, self.n_p, self.n_p),
+                           dtype=ts_float)
+            tmp[:, ii, jj] = fct[ifs]
+            # The real and imaginary parts of the phases (nf x np x
+            # n_s) are viewed as interleaved real columns, so that
+            # each frequency is a single real matrix-matrix product.
+            x = np.ascontiguousarray(phr[:, :, ifs].transpose(2, 1, 0),
+                                     dtype=ts_complex)
+            x = np.matmul(tmp, x.view(ts_float)).view(ts_complex)
+            out[:, :, ifs] = x.transpose(2, 1, 0)
+        return out
+
+    def calcCohMat(self, f, comp):
+        """
+        Compute the coherence matrix of velocity component `comp` for
+        each frequency in `f`.
+
+        Parameters
+        ----------
+        f : array_like(nf)
+            The frequencies at which to compute the coherence.
+        comp : int {0,1,2}
+               The velocity component.
+
+        Returns
+        -------
+        coh : array_like(nf,np,np)
+              The coherence matrix for each frequency.
+
+        Notes
+        -----
+
+        This default implementation calls :meth:`calcCoh` once for
+        each grid-point pair (with the full frequency vector `f`).
+        Sub-classes should override this method with a vectorized
+        form of their coherence function when possible.
+
+        """
+        out = np.empty((len(f), self.n_p, self.n_p), dtype=ts_float)
+        for ii, jj in self._iter_inds():
+            if ii == jj:
+                out[:, ii, ii] = 1
+            else:
+                out[:, ii, jj] = out[:, jj, ii] = self.calcCoh(f, comp, ii, jj)
         return out
 
     def calcCoh(self, f, comp, ii, jj):
@@ -194,23 +738,13 @@ class cohereUser(cohereObj):
     def __init__(self, array):
         self.array = array
 
-    def calc_phases(self, phases):
+    def calcCohMat(self, f, comp):
         """
-        Compute and set the full cross-spectral matrix for component
-        *comp* for 'coherence calculator' instance *cohi*.
-
-        This method should not be called explicitly.  It is called by
-        a 'coherence calculator' instance's __call__ method.
-
-        This routine utilizes a model's 'calcCoh' method, which must
-        be defined explicitly for all sub-classes of cohereModelBase.
-
+        Return the coherence matrices of component `comp` at the
+        frequencies `f` from the input array.
         """
-        tmp = np.empty((self.n_p, self.n_p), dtype=ts_float, order='F')
-        for ff in np.range(self.n_f):
-            tmp[:] = cholesky(self.array[comp, :, :, ff])
-            for ii in range(self.n_p):
-                coh[ii, ff] = (tmp * phases[:, ff]).sum(-1) 
+        inds = np.searchsorted(self.grid.f, f)
+        return np.rollaxis(self.array[comp][:, :, inds], 2, 0)
 
 
 class cohereModelBase(modelBase, gridProps):
@@ -237,6 +771,15 @@ class cohereModelBase(modelBase, gridProps):
     """
     cohereObj = cohereObj  # This needs to be set to the appropriate
                            # 'coherence object' for each model.
+    # Coherence values below this are treated as zero: at frequencies
+    # where the coherence of every pair of points is below `coh_tol`
+    # the phases are not correlated. Set to None to correlate the
+    # phases at all frequencies.
+    coh_tol = 1.2e-7
+    # The method used to factor the coherence matrices, and the
+    # tolerance of the 'lowrank' method (see :class:`cohereObj`).
+    method = 'dense'
+    lowrank_tol = 1e-2
 
     def __call__(self, tsrun):
         """
@@ -267,6 +810,9 @@ class cohereModelBase(modelBase, gridProps):
 
         """
         out = self.cohereObj(tsrun)
+        out.coh_tol = self.coh_tol
+        out.method = self.method
+        out.lowrank_tol = self.lowrank_tol
         if hasattr(self, 'set_coefs'):
             self.set_coefs(out)
         return out
@@ -0,0 +1,163 @@
+"""
+This module defines the coherence 'factor cache'.
+
+Computing (and factoring) the coherence matrices is the most
+expensive part of a PyTurbSim run. Those factors depend only on the
+grid, the frequency vector, the mean velocity profile and the
+coherence model parameters. They do not depend on the random
+seed. When many runs are performed that differ only in `RandSeed`,
+a :class:`factorCache` can be used to hold the factors from one run
+to the next, e.g.::
+
+    cache = factorCache(max_bytes='2GB')
+    for seed in seeds:
+        tsr = tsrun(seed, cohere_cache=cache)
+        ...
+        tsdat = tsr()
+
+The factors are stored in LAPACK's 'packed' lower-triangular
+(column-order) format: one row of length n_p*(n_p+1)/2 for each
+frequency.
+
+"""
+from ..base import ts_float
+from ..misc import parse_bytes
+from collections import OrderedDict
+import numpy as np
+import hashlib
+import os
+
+
+class factorCache(object):
+
+    """
+    A least-recently-used (LRU) cache of coherence-matrix Cholesky
+    factors.
+
+    Parameters
+    ----------
+    max_bytes : int or str, optional ('1GB')
+                The maximum total size of the factors held in the
+                cache. When this is exceeded the least-recently-used
+                entries are evicted.
+    directory : str, optional (None)
+                If specified, the factors are stored in this directory
+                (as .npy files) and are loaded as read-only
+                memory-maps. Entries in this directory persist across
+                python sessions (the least-recently-used are removed
+                if they exceed `max_bytes`).
+
+    """
+
+    def __init__(self, max_bytes='1GB', directory=None):
+        self.max_bytes = parse_bytes(max_bytes)
+        self.directory = directory
+        self._entries = OrderedDict()
+        self.nbytes = 0
+        if directory is not None:
+            if not os.path.isdir(directory):
+                os.makedirs(directory)
+            # Load existing entries, oldest first.
+            fnames = [fn for fn in os.listdir(directory)
+                      if fn.endswith('.npy')]
+            fnames.sort(key=lambda fn: os.path.getmtime(
+                os.path.join(directory, fn)))
+            for fn in fnames:
+                self._entries[fn[:-4]] = os.path.getsize(
+                    os.path.join(directory, fn))
+                self.nbytes += self._entries[fn[:-4]]
+            # The directory may have been filled with a larger
+            # max_bytes.
+            self._evict()
+
+    def __repr__(self,):
+        return ('<factorCache: %d entries, %0.1f of %0.1f MB%s>' %
+                (len(self), self.nbytes / 2. ** 20, self.max_bytes / 2. ** 20,
+                 '' if self.directory is None else
+                 " in '%s'" % self.directory))
+
+    def __len__(self,):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    @staticmethod
+    def _size(val):
+        if isinstance(val, (int, long)):
+            return val
+        return val.nbytes
+
+    @staticmethod
+    def key(grid, f, u, params):
+        """
+        Compute the cache key for the factors of a coherence model
+        with parameters `params` on `grid`, at frequencies `f` with
+        mean u-velocity `u`.
+        """
+        hsh = hashlib.sha1()
+        for arr in [grid.y, grid.z, f, u]:
+            hsh.update(np.array(arr, dtype=ts_float).tostring())
+        hsh.update(repr(params))
+        return hsh.hexdigest()
+
+    def _fname(self, key):
+        return os.path.join(self.directory, key + '.npy')
+
+    def get(self, key):
+        """
+        Return the factors for `key`, or None if they are not in the
+        cache.
+        """
+        if key not in self._entries:
+            return None
+        val = self._entries.pop(key)
+        self._entries[key] = val
+        if self.directory is None:
+            return val
+        fname = self._fname(key)
+        os.utime(fname, None)
+        return np.load(fname, mmap_mode='r')
+
+    def set(self, key, val):
+        """
+        Store the factors `val` in the cache under `key`, and return
+        them (as a memory-map if this is a disk-cache).
+        """
+        if key in self._entries:
+            self.pop(key)
+        if val.nbytes > self.max_bytes:
+            # Don't evict the whole cache for something that won't fit.
+            return val
+        if self.directory is not None:
+            np.save(self._fname(key), val)
+            self._entries[key] = val.nbytes
+            val = np.load(self._fname(key), mmap_mode='r')
+        else:
+            self._entries[key] = val
+        self.nbytes += val.nbytes
+        self._evict()
+        return val
+
+    def pop(self, key):
+        """
+        Remove the entry `key` from the cache.
+        """
+        self.nbytes -= self._size(self._entries.pop(key))
+        if self.directory is not None:
+            os.remove(self._fname(key))
+
+    def _evict(self,):
+        """
+        Remove least-recently-used entries until the cache fits
+        within :attr:`max_bytes`.
+        """
+        while self.nbytes > self.max_bytes:
+            self.pop(next(iter(self._entries)))
+
+    def clear(self,):
+        """
+        Remove all entries from the cache.
+        """
+        for key in list(self._entries):
+            self.pop(key)
@@ -6,6 +6,9 @@ iec  - The IEC coherence model.
 from .base import cohereModelBase, np, ts_float, cohereObj, ts_complex
 from ..base import tslib, dbg
 from ..misc import Lambda
+from ..phaseModels.main import philoxPhase
+from numpy.fft import fft2, ifft2
+from warnings import warn
 
 
 class cohereObjNone(cohereObj):
@@ -14,8 +17,9 @@ class cohereObjNone(cohereObj):
     This is a 'dummy' coherence object that forces the coherence to
     zero.
     """
+    _corr_comps = ()
 
-    def calc_phases(self, phases):
+    def calc_phases(self, phases, ifreq=slice(None)):
         return phases
 
     def calcCoh(self, f, comp, ii, jj):
@@ -33,7 +37,7 @@ class none(cohereModelBase):
 
 class cohereObjNWTC(cohereObj):
 
-    def calc_phases(self, phases):
+    def calc_phases(self, phases, ifreq=slice(None)):
         """
         Compute the `correlated phases` for each grid-point from the
         input `phases` based on the coherence NWTC 'non-IEC coherence
@@ -44,6 +48,9 @@ class cohereObjNWTC(cohereObj):
         phases : array_like(np, nf)
                  The input (generally randomized) phases for each
                  point for each frequency.
+        ifreq : slice, optional
+                The frequencies (indices into grid.f) that `phases`
+                correspond to.
 
         Returns
         -------
@@ -62,18 +69,30 @@ class cohereObjNWTC(cohereObj):
         calcCoh : computes the coherence for individual grid-point pairs.
 
         """
-        if tslib is not None:
-            tmp = np.zeros((self.n_p, self.n_f), dtype=ts_complex, order='F')
+        if (tslib is not None and self.cache is None and
+                self.method == 'dense'):
+            f = self.grid.f[ifreq]
             u = self.grid.flatten(self.prof.u).copy(order='F')
-            for icomp in range(3):
-                tmp[:] = phases[icomp]
-                tslib.nonieccoh(tmp, self.grid.f,
-                                self.grid.y, self.grid.z, u,
-                                self.a[icomp], self.b[icomp], self.CohExp,
-                                self.ncore, self.n_f, self.n_y, self.n_z)
-                phases[icomp] = tmp
+            for comps in self._comp_groups():
+                n = self._n_corr(comps[0], f)
+                if not n:
+                    continue
+                if len(comps) > 1:
+                    # Factor once for the components of this group.
+                    self._corr_phases_group(phases, comps, f[:n])
+                    continue
+                icomp = comps[0]
+                tmp = np.array(phases[icomp][:, :n], dtype=ts_complex,
+                               order='F')
+                stat = tslib.nonieccoh(tmp, f[:n],
+                                       self.grid.y, self.grid.z, u,
+                                       self.a[icomp], self.b[icomp],
+                                       self.CohExp, self.ncore, n,
+                                       self.n_y, self.n_z, parf=self._parf)
+                phases[icomp][:, :n] = self._fix_phases(tmp, stat,
+                                                        icomp, f[:n])
         else:
-            phases = cohereObj.calc_phases(self, phases)
+            phases = cohereObj.calc_phases(self, phases, ifreq)
         return phases
 
     def calcCoh(self, f, comp, ii, jj):
@@ -95,6 +114,52 @@ class cohereObjNWTC(cohereObj):
         return np.exp(-self.a[comp] * (r / zm) ** self.CohExp *
                       np.sqrt((f * r / um) ** two + (self.b[comp] * r) ** two))
 
+    def calcCohMat(self, f, comp):
+        """
+        Compute the NWTC coherence matrix of velocity component `comp`
+        for each frequency in `f`.
+
+        This is a vectorized form of :meth:`calcCoh` that evaluates
+        the coherence of all grid-point pairs at once. It is only used
+        if the TSlib fortran library is not available.
+        """
+        two = ts_float(2)
+        tmp = self.a[comp] * self._r
+        if self.CohExp != 0:
+            tmp = tmp * (self._r / self._zm) ** self.CohExp
+        return np.exp(-tmp * np.sqrt((f[:, None, None] / self._um) ** two +
+                                     self.b[comp] ** two))
+
+    def _f_cut(self, comp):
+        zz, yy = self._zz, self._yy
+        uu = self.grid.flatten(self.prof.u)
+
+        def K(ii, jj):
+            r = np.sqrt((zz[jj] - zz[ii]) ** 2 + (yy[jj] - yy[ii]) ** 2)
+            if self.CohExp != 0:
+                zm = (zz[ii] + zz[jj]) / 2
+                return self.a[comp] * r * (r / zm) ** self.CohExp
+            return self.a[comp] * r
+
+        def um(ii, jj):
+            return (uu[ii] + uu[jj]) / 2
+
+        return self._f_cut_decay(K, um, self.b[comp])
+
+    def _cache_params(self, comp):
+        return ('nwtc', float(self.a[comp]), float(self.b[comp]),
+                float(self.CohExp))
+
+    def _calc_factors(self, comp, f):
+        if tslib is None:
+            return cohereObj._calc_factors(self, comp, f)
+        u = self.grid.flatten(self.prof.u).copy(order='F')
+        fct, stat = tslib.noniecfact(f, self.grid.y, self.grid.z, u,
+                                     self.a[comp], self.b[comp],
+                                     self.CohExp, self.ncore,
+                                     parf=self._parf)
+        return self._fix_factors(fct.T, stat, comp, f)
+
 
 class nwtc(cohereModelBase):
 
@@ -112,6 +177,13 @@ class nwtc(cohereModelBase):
         coherence function for each velocity component.
     CohExp : float
              The 'Coherence Exponent' parameter for the coherence function.
+    method : str {'dense', 'lowrank'}, optional ('dense')
+             The method used to factor the coherence matrices. 'dense'
+             is the Cholesky factorization. 'lowrank' is a truncated
+             eigen-decomposition that reproduces the coherence
+             matrices to a relative error of :attr:`lowrank_tol`
+             (see :meth:`cohereObj._lowrank_phases
+             <pyts.cohereModels.base.cohereObj._lowrank_phases>`).
 
     Notes
     -----
@@ -142,7 +214,8 @@ class nwtc(cohereModelBase):
 
     cohereObj = cohereObjNWTC  # This must be defined for each coherence model.
 
-    def __init__(self, a=[None, None, None], b=[0., 0., 0.], CohExp=0.0):
+    def __init__(self, a=[None, None, None], b=[0., 0., 0.], CohExp=0.0,
+                 method='dense'):
         """
         Create a NWTC 'non-IEC' coherence model.
 
@@ -159,7 +232,12 @@ class nwtc(cohereModelBase):
             The second coherence decrement input parameter for each
             velocity component.  Each element defaults to 0.
         CohExp :  float, optional
+        method : {'dense', 'lowrank'}, optional
         """
+        if method not in ['dense', 'lowrank']:
+            raise ValueError("The NWTC coherence method must be "
+                             "'dense' or 'lowrank'.")
+        self.method = method
         if CohExp is None:
             self.CohExp = 0.0
         else:
@@ -204,6 +282,16 @@ class nwtc(cohereModelBase):
 
 
 class cohereObjIEC(cohereObj):
+    # Only the u-component is correlated.
+    _corr_comps = (0, )
+    # The method used to correlate the phases ('dense', 'circulant'
+    # or 'lowrank').
+    method = 'dense'
+    # The factors (of the minimal size) of the circulant embeddings
+    # that are tried, and the (relative) tolerance for negative
+    # eigenvalues of the embedding.
+    circulant_pad = (1, 2, 4)
+    circulant_tol = 1e-6
 
     def calcCoh(self, f, comp, ii, jj):
         """
@@ -240,7 +328,48 @@ class cohereObjIEC(cohereObj):
         else:
             return 0
 
-    def calc_phases(self, phases):
+    def calcCohMat(self, f, comp):
+        """
+        Compute the IEC coherence matrix of velocity component `comp`
+        for each frequency in `f`.
+
+        This is a vectorized form of :meth:`calcCoh`. It is only used
+        if tslib is not available.
+        """
+        if comp == 0:
+            return np.exp(-self.a * self._r *
+                          np.sqrt((f[:, None, None] / self.prof.uhub) ** 2 +
+                                  (0.12 / self.Lc) ** 2))
+        out = np.zeros((len(f), self.n_p, self.n_p), dtype=ts_float)
+        out[:, range(self.n_p), range(self.n_p)] = 1
+        return out
+
+    def _f_cut(self, comp):
+        if comp != 0:
+            return None
+        zz, yy = self._zz, self._yy
+
+        def K(ii, jj):
+            return self.a * np.sqrt((zz[jj] - zz[ii]) ** 2 +
+                                    (yy[jj] - yy[ii]) ** 2)
+
+        def um(ii, jj):
+            return self.prof.uhub
+
+        return self._f_cut_decay(K, um, 0.12 / self.Lc)
+
+    def _cache_params(self, comp):
+        return ('iec', comp, float(self.a), float(self.Lc))
+
+    def _calc_factors(self, comp, f):
+        if tslib is None:
+            return cohereObj._calc_factors(self, comp, f)
+        fct, stat = tslib.iecfact(f, self.grid.y, self.grid.z,
+                                  self.prof.uhub, self.a, self.Lc,
+                                  self.ncore, parf=self._parf)
+        return self._fix_factors(fct.T, stat, comp, f)
+
+    def calc_phases(self, phases, ifreq=slice(None)):
         """
         Compute and set the full cross-coherence matrix for component
         *comp* for 'coherence calculator' instance *cohi*.
@@ -249,16 +378,150 @@ class cohereObjIEC(cohereObj):
         the IEC model.
 
         """
-        if tslib is not None:
-            out = phases[0].copy(order='F')
-            tslib.ieccoh(out, self.grid.f,
-                         self.y, self.z, self.prof.uhub,
-                         self.a, self.Lc,
-                         self.ncore, self.n_f, self.n_y, self.n_z)
-            phases[0] = out
+        f = self.grid.f[ifreq]
+        n = self._n_corr(0, f)
+        if not n:
             return phases
+        if self.method == 'circulant' and self._circ_ok:
+            i_f = np.arange(self.grid.n_f)[ifreq][:n]
+            phases[0][:, :n] = self._circ_phases(phases[0][:, :n], i_f)
+        elif self.method == 'lowrank':
+            phases[0][:, :n] = self._corr_phases(phases[0][:, :n], 0, f[:n])
         else:
-            return cohereObj.calc_phases(self, phases)
+            phases[0][:, :n] = self._dense_phases(phases[0][:, :n], f[:n])
+        return phases
+
+    def calc_phases_multi(self, phases, ifreq=slice(None), seeds=None):
+        if self.method == 'circulant' and self._circ_ok:
+            f = self.grid.f[ifreq]
+            n = self._n_corr(0, f)
+            i_f = np.arange(self.grid.n_f)[ifreq][:n]
+            for isd in range(phases.shape[0]):
+                if n:
+                    phases[isd, 0][:, :n] = self._circ_phases(
+                        phases[isd, 0][:, :n], i_f,
+                        None if seeds is None else seeds[isd])
+            return phases
+        return cohereObj.calc_phases_multi(self, phases, ifreq, seeds)
+    calc_phases_multi.__doc__ = cohereObj.calc_phases_multi.__doc__
+
+    def _dense_phases(self, phr, f):
+        """
+        Correlate the u-component phases, `phr` (np x nf), at
+        frequencies `f` using a dense factorization of the coherence
+        matrix at each frequency.
+        """
+        if tslib is not None and self.cache is None:
+            out = phr.copy(order='F')
+            stat = tslib.ieccoh(out, f,
+                                self.y, self.z, self.prof.uhub,
+                                self.a, self.Lc,
+                                self.ncore, len(f), self.n_y, self.n_z,
+                                parf=self._parf)
+            return self._fix_phases(out, stat, 0, f)
+        return self._corr_phases(phr, 0, f)
+
+    @property
+    def _circ_ok(self,):
+        """
+        True if the grid is uniform (so that the coherence matrix is
+        block-Toeplitz with Toeplitz blocks).
+        """
+        if not hasattr(self, '_circ_ok_val'):
+            self._circ_ok_val = True
+            for x in [self.grid.z, self.grid.y]:
+                if len(x) > 2 and not np.allclose(np.diff(x), x[1] - x[0]):
+                    warn("The grid is not uniform, using the 'dense' IEC "
+                         "coherence method.")
+                    self._circ_ok_val = False
+                    break
+        return self._circ_ok_val
+
+    def _circ_shape(self, pad=1):
+        """
+        The (z, y) shape of the periodic grid into which this grid is
+        embedded.
+        """
+        return tuple(2 * (n - 1) * pad if n > 1 else 1
+                     for n in (self.n_z, self.n_y))
+
+    def _circ_eig(self, f, shape):
+        """
+        The eigenvalues (nf x mz x my) of the circulant embedding, of
+        `shape` (mz, my), of the u-component coherence matrix at
+        frequencies `f`.
+        """
+        d = []
+        for x, m in zip([self.grid.z, self.grid.y], shape):
+            k = np.arange(m)
+            d.append(np.minimum(k, m - k) * (x[1] - x[0] if len(x) > 1 else 0))
+        r = np.sqrt(d[0][:, None] ** 2 + d[1][None, :] ** 2)
+        alpha = self.a * np.sqrt((f / self.prof.uhub) ** 2 +
+                                 (0.12 / self.Lc) ** 2)
+        return fft2(np.exp(-alpha[:, None, None] * r)).real
+
+    def _circ_phases(self, phr, i_f, seed=None):
+        """
+        Correlate the u-component phases, `phr` (np x nf), at the
+        frequency indices `i_f` by circulant embedding. The random
+        phases of the padding points are Philox phasors (see
+        :class:`philoxPhase <pyts.phaseModels.main.philoxPhase>`)
+        with the key (`seed`, 3), where `seed` defaults to the run's
+        RandSeed. They depend only on the seed and frequency, so they
+        do not depend on how the frequencies are blocked.
+
+        The IEC coherence only depends on the distance between
+        points, so on a uniform grid it can be embedded in a
+        (2*nz-2 x 2*ny-2) periodic grid, whose coherence matrix is
+        diagonalized by the 2-D FFT. The phases are placed in this
+        grid (the other points get independent random phases), and
+        are correlated by a (circular) convolution with the
+        square-root of the coherence. This is O(n_p log(n_p)) per
+        frequency, rather than O(n_p^3).
+
+        The embedding is only valid if all of its eigenvalues are
+        non-negative. At frequencies where they are not, larger
+        embeddings are tried (see :attr:`circulant_pad`), and if those
+        fail the dense method is used.
+        """
+        n_z, n_y = self.n_z, self.n_y
+        f = self.grid.f[i_f]
+        if seed is None:
+            seed = self._run.RandSeed
+        seed = philoxPhase._key(seed)
+        out = np.empty(phr.shape, dtype=ts_complex)
+        nblk = max(int(self.blocksize_bytes //
+                       (64 * np.array(self._circ_shape(self.circulant_pad[-1])).prod())), 1)
+        n_dense = 0
+        for i0 in range(0, len(f), nblk):
+            ifs = np.arange(i0, min(i0 + nblk, len(f)))
+            for pad in self.circulant_pad:
+                shape = self._circ_shape(pad)
+                lam = self._circ_eig(f[ifs], shape)
+                lmax = lam.max(-1).max(-1)
+                ok = lam.min(-1).min(-1) >= -self.circulant_tol * lmax
+                if not ok.any():
+                    continue
+                lam = np.sqrt(np.maximum(lam[ok], 0))
+                w = np.empty((np.array(shape).prod(), ok.sum()),
+                             dtype='complex128')
+                philoxPhase._fill(w, seed, 3, i_f[ifs[ok]],
+                                  self._run._segment)
+                w = w.T.reshape((-1, ) + shape)
+                w[:, :n_z, :n_y] = phr[:, ifs[ok]].T.reshape(-1, n_z, n_y)
+                w = ifft2(lam * fft2(w))[:, :n_z, :n_y]
+                out[:, ifs[ok]] = w.reshape(-1, n_z * n_y).T
+                ifs = ifs[~ok]
+                if len(ifs) == 0:
+                    break
+            if len(ifs):
+                n_dense += len(ifs)
+                out[:, ifs] = self._dense_phases(phr[:, ifs], f[ifs])
+        if n_dense:
+            warn("The circulant embedding of the IEC coherence is not "
+                 "positive-definite at %d frequencies; the dense method "
+                 "was used at those frequencies." % n_dense)
+        return out
 
 
 class iec(cohereModelBase):
@@ -272,6 +535,16 @@ class iec(cohereModelBase):
     IECedition : int {2, 3},
                  Different IEC editions have slightly different
                  coefficients to the spectral model.
+    method : str {'dense', 'circulant', 'lowrank'}, optional ('dense')
+             The method used to correlate the phases. 'dense'
+             factors the full coherence matrix at each frequency
+             (O(n_p^3)). 'circulant' uses a circulant embedding of
+             the coherence matrix and FFTs (O(n_p log(n_p))), which is
+             much faster for large grids (see
+             :meth:`cohereObjIEC._circ_phases`). 'lowrank' uses a
+             truncated eigen-decomposition (see :class:`nwtc`). The
+             methods produce different realizations for the same
+             `RandSeed`.
 
     Notes
     -----
@@ -311,7 +584,11 @@ class iec(cohereModelBase):
         """
         return self._Lfactor * Lambda(zhub, self.IECedition)
 
-    def __init__(self, IECedition=3, ):
+    def __init__(self, IECedition=3, method='dense'):
+        if method not in ['dense', 'circulant', 'lowrank']:
+            raise ValueError("The IEC coherence method must be "
+                             "'dense', 'circulant' or 'lowrank'.")
+        self.method = method
         self.IECedition = IECedition
         if IECedition <= 2:
             # The Lambda function includes a factor of 0.7 (_Lfactor*0.7=2.45).
@@ -0,0 +1,293 @@
+"""
+This module defines the inverse-FFT 'backends' that PyTurbSim uses to
+compute the output timeseries from the spectrum.
+
+Available backends
+------------------
+numpy
+  numpy.fft.irfft (always available, returns float64). numpy's FFT
+  releases the GIL, so the rows are split across `ncore` threads.
+
+fftw
+  pyFFTW's FFTW plans (threaded, preserves float32). Plans are kept
+  for the life of the process, and FFTW 'wisdom' is saved in the
+  cache directory so that later processes do not re-plan.
+
+The backend of a run is selected with :attr:`tsrun.fft
+<pyts.main.tsrun.fft>`. 'auto' selects 'fftw' if it is available,
+otherwise 'numpy'. In 'double' precision runs (see :attr:`tsrun.precision
+<pyts.main.tsrun.precision>`) the transform is always computed in
+double precision.
+
+The cache directory is ``~/.pyts`` (or the ``PYTS_CACHE_DIR``
+environment variable). It also holds the measured transform times used
+by :func:`fast_nt` to choose the number of timesteps of a grid.
+
+"""
+from .misc import lowPrimeFact_near, pfactor
+from numpy.fft import irfft as np_irfft
+import numpy as np
+import cPickle as pickle
+from multiprocessing import cpu_count
+from threading import Thread
+import json
+import time
+import os
+try:
+    import pyfftw
+except ImportError:
+    pyfftw = None
+
+
+def cache_dir():
+    """
+    The directory in which FFT wisdom and timings are stored (it is
+    created if it does not exist).
+    """
+    out = os.environ.get('PYTS_CACHE_DIR',
+                         os.path.join(os.path.expanduser('~'), '.pyts'))
+    if not os.path.isdir(out):
+        os.makedirs(out)
+    return out
+
+
+def _replace(src, dst):
+    """
+    Rename the file `src` to `dst`, replacing `dst`.
+
+    On Windows os.rename fails if `dst` exists, so it is removed
+    first. Errors are ignored: the cache files are only an
+    optimization.
+    """
+    try:
+        if os.path.exists(dst) and os.name == 'nt':
+            os.remove(dst)
+        os.rename(src, dst)
+    except OSError:
+        pass
+
+
+class fftBackend(object):
+
+    """
+    The base class for inverse-FFT backends.
+    """
+    name = None
+    # Does irfft return float32 for complex64 input?
+    single = False
+    available = True
+
+    def irfft(self, x, ncore=1):
+        """
+        The inverse FFT of the (real-valued) spectrum `x` along its
+        last axis.
+
+        Parameters
+        ----------
+        x :     array_like(..., n_f+1), complex
+                The spectrum.
+        ncore : int, optional (1)
+                The number of threads (values less than 1 use all
+                cores).
+
+        Returns
+        -------
+        out :   array_like(..., 2*n_f)
+                The timeseries. This may be a buffer that is
+                overwritten by the next call, so copy it if it is to be
+                kept.
+        """
+        raise NotImplementedError
+
+    def time_irfft(self, n, n_row=16, n_rep=3):
+        """
+        Measure the time (seconds) to compute `n_row` inverse FFTs of
+        length `n` (complex64 input).
+        """
+        x = np.random.RandomState(0).randn(n_row, n // 2 + 1).astype(np.complex64)
+        self.irfft(x)  # Warm-up (and planning).
+        out = np.inf
+        for irep in range(n_rep):
+            t0 = time.time()
+            self.irfft(x)
+            out = min(out, time.time() - t0)
+        return out
+
+
+class numpyFFT(fftBackend):
+
+    """
+    The numpy.fft backend.
+    """
+    name = 'numpy'
+
+    def irfft(self, x, ncore=1):
+        if ncore < 1:
+            ncore = cpu_count()
+        rows = x.reshape(-1, x.shape[-1])
+        ncore = min(ncore, rows.shape[0])
+        if ncore <= 1:
+            return np_irfft(x)
+        out = np.empty((rows.shape[0], 2 * (x.shape[-1] - 1)))
+        errors = []
+
+        def work(i0, i1):
+            try:
+                out[i0:i1] = np_irfft(rows[i0:i1])
+            except Exception as err:
+                errors.append(err)
+
+        bounds = np.linspace(0, rows.shape[0], ncore + 1).astype(int)
+        threads = [Thread(target=work, args=(bounds[idx], bounds[idx + 1]))
+                   for idx in range(ncore)]
+        for thr in threads:
+            thr.start()
+        for thr in threads:
+            thr.join()
+        if errors:
+            raise errors[0]
+        return out.reshape(x.shape[:-1] + out.shape[-1:])
+
+
+class fftwFFT(fftBackend):
+
+    """
+    The pyFFTW backend.
+
+    Parameters
+    ----------
+    planner_effort : str, optional ('FFTW_MEASURE')
+                     The FFTW planner effort.
+    """
+    name = 'fftw'
+    single = True
+    available = pyfftw is not None
+    _wisdom_file = 'fftw_wisdom.pkl'
+
+    def __init__(self, planner_effort='FFTW_MEASURE'):
+        self.planner_effort = planner_effort
+        self._plans = {}
+        self._wisdom_loaded = False
+
+    def _load_wisdom(self,):
+        self._wisdom_loaded = True
+        fname = os.path.join(cache_dir(), self._wisdom_file)
+        if os.path.isfile(fname):
+            with open(fname, 'rb') as fl:
+                try:
+                    pyfftw.import_wisdom(pickle.load(fl))
+                except Exception:
+                    # A corrupt or incompatible wisdom file only costs
+                    # the planning time.
+                    pass
+
+    def _save_wisdom(self,):
+        fname = os.path.join(cache_dir(), self._wisdom_file)
+        with open(fname + '.tmp', 'wb') as fl:
+            pickle.dump(pyfftw.export_wisdom(), fl, -1)
+        _replace(fname + '.tmp', fname)
+
+    def plan(self, shape, dtype, ncore=1):
+        """
+        The (cached) FFTW plan for inverse transforms of arrays of
+        `shape` and `dtype`, using `ncore` threads.
+        """
+        if ncore < 1:
+            ncore = pyfftw.config.NUM_THREADS
+        key = (tuple(shape), np.dtype(dtype).str, ncore)
+        if key not in self._plans:
+            if not self._wisdom_loaded:
+                self._load_wisdom()
+            self._plans[key] = pyfftw.builders.irfft(
+                pyfftw.empty_aligned(shape, dtype=dtype),
+                planner_effort=self.planner_effort,
+                threads=ncore)
+            self._save_wisdom()
+        return self._plans[key]
+
+    def irfft(self, x, ncore=1):
+        return self.plan(x.shape, x.dtype, ncore)(x)
+
+
+backends = dict((be.name, be) for be in
+                [numpyFFT(), fftwFFT()])
+
+
+def get_backend(name='auto'):
+    """
+    Return the FFT backend `name` ('auto', 'numpy' or 'fftw'), or `name` itself if it is an :class:`fftBackend`
+    instance.
+    """
+    if isinstance(name, fftBackend):
+        return name
+    if name == 'auto':
+        for nm in ['fftw', 'numpy']:
+            if backends[nm].available:
+                return backends[nm]
+    if name not in backends:
+        raise ValueError("Invalid FFT backend '%s', must be one of: 'auto', %s."
+                         % (name, ', '.join("'%s'" % nm for nm in sorted(backends))))
+    if not backends[name].available:
+        raise ImportError("The '%s' FFT backend is not available." % name)
+    return backends[name]
+
+
+def _timings_file():
+    return os.path.join(cache_dir(), 'fft_times.json')
+
+
+def fast_nt(n, nmin=None, fft='auto', pmax=31):
+    """
+    Choose a fast (even) number of timesteps near `n`, based on the
+    measured transform times of the FFT backend `fft`.
+
+    The candidates are the even integers within 1% (at least 16) of
+    `n`, and no smaller than `nmin` (default `n`), whose prime factors
+    are all at most 71 (sizes with large prime factors are slow for
+    every backend, and slow to measure), together with the low-prime
+    size from :func:`lowPrimeFact_near
+    <pyts.misc.lowPrimeFact_near>`. The times are cached (in
+    :func:`cache_dir`) for each backend, so each size is measured
+    only once.
+
+    Parameters
+    ----------
+    n :     int
+            The requested number of timesteps.
+    nmin :  int, optional (`n`)
+            The minimum number of timesteps.
+    fft :   str or :class:`fftBackend`, optional ('auto')
+            The FFT backend.
+    pmax :  int, optional (31)
+            The maximum prime of the low-prime candidate.
+
+    Returns
+    -------
+    n_t :   int
+            The size with the smallest measured time.
+    """
+    be = get_backend(fft)
+    if nmin is None:
+        nmin = n
+    dn = max(n // 100, 16)
+    lo = max(nmin, n - dn)
+    cands = set(nc for nc in range(lo + lo % 2, n + dn + 1, 2)
+                if pfactor(nc, 71)[-1] <= 71)
+    cands.add(lowPrimeFact_near(n, nmin=nmin, pmax=pmax))
+    fname = _timings_file()
+    try:
+        with open(fname, 'r') as fl:
+            times = json.load(fl)
+    except (IOError, ValueError):
+        times = {}
+    tbe = times.setdefault(be.name, {})
+    new = False
+    for nc in cands:
+        if str(nc) not in tbe:
+            tbe[str(nc)] = be.time_irfft(nc)
+            new = True
+    if new:
+        with open(fname + '.tmp', 'w') as fl:
+            json.dump(times, fl)
+        _replace(fname + '.tmp', fname)
+    return min(sorted(cands), key=lambda nc: tbe[str(nc)])
@@ -5,6 +5,8 @@ A base module for the io package.
 # This defines the 'endianness' for reading/writing binary files in PyTurbSim.
 e = '<'
 from os.path import isfile
+import numpy as np
+from ..base import lazyArray
 
 
 def convname(fname, extension=None):
@@ -18,6 +20,27 @@ def convname(fname, extension=None):
     return fname.rsplit('.', 1)[0] + extension
 
 
+def stripinp(fname):
+    """
+    Remove the input-file extension ('.inp'), if there is one.
+    """
+    if fname.endswith('.inp'):
+        fname = fname[:-4]
+    return fname
+
+
+def outname(fname, extension):
+    """
+    The name of an output file: `fname` with any '.inp' extension
+    (or trailing path separator) removed, and `extension` added if it
+    has no other extension.
+    """
+    fname = stripinp(fname.rstrip('/\\'))
+    if '.' not in (fname.split('/')[-1]).split('\\')[-1]:
+        fname += extension
+    return fname
+
+
 def checkname(fname, extensions=[]):
     """Test whether fname exists.
 
@@ -36,3 +59,205 @@ def checkname(fname, extensions=[]):
             return fnm
     raise IOError("No such file or directory: '%s', and no "
                   "files found with specified extensions." % fname)
+
+
+class mmapArray(lazyArray):
+
+    """
+    A lazy, scaled view of the int16 velocity data in a binary
+    full-field file.
+
+    The data is held in a (read-only) memory-map of the file. It is
+    only read and scaled (``(raw - offset) / scale``, less the
+    `mean`) when it is indexed, so that indexing a time-slice, a
+    grid-point or a component only touches those bytes of the
+    file. Any other use of this object (arithmetic, numpy functions
+    or ndarray methods) loads the full array (see :class:`lazyArray
+    <pyts.base.lazyArray>`).
+
+    Parameters
+    ----------
+    raw : :class:`numpy.memmap`
+          The int16 data, as a (component, z, y, time) view.
+    offset : array_like (3)
+             The offset of each component.
+    scale : array_like (3)
+            The scale factor of each component.
+    mean : array_like (3 x n_z x n_y), optional
+           The time-mean that is subtracted from the data.
+
+    """
+
+    #: The (approximate) size, in bytes, of the time-chunks that
+    #: :meth:`tmean` reads at once.
+    chunk_bytes = 2 ** 24
+
+    def __init__(self, raw, offset, scale, mean=None):
+        self.raw = raw
+        self.offset = np.asarray(offset, dtype=np.float32)
+        self.scale = np.asarray(scale)
+        if mean is not None:
+            mean = np.asarray(mean, dtype=np.float32)
+        self.mean = mean
+
+    @property
+    def shape(self,):
+        return self.raw.shape
+
+    @property
+    def dtype(self,):
+        return np.dtype(np.float32)
+
+    def __repr__(self,):
+        return '<mmapArray: shape %s, of %s>' % (self.shape,
+                                                 self.raw.filename)
+
+    def _bcast(self, arr):
+        # A zero-stride view of `arr` with the shape of the data, so
+        # that it can be indexed with the same index as the data.
+        arr = arr.reshape(arr.shape + (1, ) * (self.ndim - arr.ndim))
+        return np.lib.stride_tricks.as_strided(
+            arr, self.shape,
+            [st if n > 1 else 0 for st, n in zip(arr.strides, arr.shape)])
+
+    def subarray(self, ind):
+        """
+        A :class:`mmapArray` of the slice `ind` (a tuple of slices of
+        the leading dimensions) of this array, that shares its
+        memory-map.
+        """
+        ind = tuple(ind)
+        mean = None if self.mean is None else self.mean[ind]
+        return mmapArray(self.raw[ind], self.offset[ind[:1]],
+                         self.scale[ind[:1]], mean)
+
+    def _getitem(self, ind):
+        out = self.raw[ind].astype(np.float32)
+        out -= self._bcast(self.offset)[ind]
+        out = (out / self._bcast(self.scale)[ind]).astype(np.float32)
+        if self.mean is not None:
+            out -= self._bcast(self.mean)[ind]
+        return out
+
+    def iter_tchunks(self,):
+        """
+        Iterate over time-slices of this array that each contain
+        (roughly) :attr:`chunk_bytes` of data.
+        """
+        n_t = self.shape[-1]
+        step = max(self.chunk_bytes // (4 * self.size // n_t), 1)
+        for i0 in xrange(0, n_t, step):
+            yield slice(i0, min(i0 + step, n_t))
+
+    def tmean(self,):
+        """
+        Compute the mean over the (last) time axis, in one pass over
+        the data.
+        """
+        out = np.zeros(self.shape[:-1], dtype=np.float64)
+        for slc in self.iter_tchunks():
+            out += self[..., slc].sum(-1, dtype=np.float64)
+        return (out / self.shape[-1]).astype(np.float32)
+
+
+class h5Array(lazyArray):
+
+    """
+    A lazy view of an HDF5 dataset (e.g. the velocity data in a
+    PyTurbSim HDF5 file).
+
+    The data is only read from the file when it is indexed, so that
+    indexing a time-slice, a grid-point or a component only reads
+    the chunks of the file that contain it (see :class:`lazyArray
+    <pyts.base.lazyArray>`).
+
+    Parameters
+    ----------
+    dset : :class:`h5py.Dataset`
+           The dataset.
+    index : list of array_like, optional (all of `dset`)
+            The indices into each dimension of `dset` of this view
+            (see :meth:`subarray`).
+
+    """
+
+    def __init__(self, dset, index=None):
+        self.dset = dset
+        if index is None:
+            index = [np.arange(n) for n in dset.shape]
+        self.index = index
+
+    @property
+    def shape(self,):
+        return tuple(len(idx) for idx in self.index)
+
+    @property
+    def dtype(self,):
+        return self.dset.dtype
+
+    def __repr__(self,):
+        return '<h5Array: shape %s, of %s>' % (self.shape,
+                                               self.dset.file.filename)
+
+    def _expand(self, ind):
+        # The index `ind` with one entry for each dimension.
+        if not isinstance(ind, tuple):
+            ind = (ind, )
+        if Ellipsis in ind:
+            iel = ind.index(Ellipsis)
+            ind = (ind[:iel] +
+                   (slice(None), ) * (self.ndim - len(ind) + 1) +
+                   ind[iel + 1:])
+        return ind + (slice(None), ) * (self.ndim - len(ind))
+
+    def subarray(self, ind):
+        """
+        An :class:`h5Array` of the slice `ind` (a tuple of slices) of
+        this array, that shares its dataset.
+        """
+        return h5Array(self.dset, [idx[i] for idx, i in
+                                   zip(self.index, self._expand(ind))])
+
+    def _getitem(self, ind):
+        # The index into the dataset, with each index array that is
+        # evenly spaced (e.g. the result of slicing) as a slice.
+        dind = []
+        for idx, i in zip(self.index, self._expand(ind)):
+            idx = idx[i]
+            if np.ndim(idx) == 0:
+                dind.append(int(idx))
+            elif len(idx) == 0:
+                dind.append(slice(0, 0))
+            elif len(idx) == 1:
+                dind.append(slice(idx[0], idx[0] + 1))
+            elif (np.diff(idx) == idx[1] - idx[0]).all():
+                stop = idx[-1] + idx[1] - idx[0]
+                dind.append(slice(idx[0], stop if stop >= 0 else None,
+                                  idx[1] - idx[0]))
+            else:
+                dind.append(idx)
+        # h5py does not support negative steps, or index arrays that
+        # are unsorted (or repeated), so those dimensions are read
+        # forward (as a slice) and then reversed or indexed in memory.
+        fwd = []
+        post = []
+        for n, idx in zip(self.dset.shape, dind):
+            if isinstance(idx, (int, long, np.integer)):
+                fwd.append(idx)
+            elif idx.__class__ is not slice:
+                fwd.append(slice(idx.min(), idx.max() + 1))
+                post.append(idx - idx.min())
+            elif (idx.step or 1) < 0:
+                rng = range(*idx.indices(n))
+                fwd.append(slice(rng[-1], rng[0] + 1, -idx.step))
+                post.append(slice(None, None, -1))
+            else:
+                fwd.append(idx)
+                post.append(None)
+        out = self.dset[tuple(fwd)]
+        for ax, idx in enumerate(post):
+            if idx.__class__ is slice:
+                out = out[(slice(None), ) * ax + (idx, )]
+            elif idx is not None:
+                out = out.take(idx, axis=ax)
+        return out
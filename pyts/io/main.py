@@ -8,7 +8,11 @@ import read
 
 readers = {'wnd': read.bladed,
            'bl': read.bladed,
-           'bts': read.turbsim, }
+           'bts': read.turbsim,
+           'pyts': read.npy, }
+if read.h5py is not None:
+    readers['h5'] = read.hdf5
+    readers['hdf5'] = read.hdf5
 
 
 def readModel(fname, ):
@@ -25,6 +29,12 @@ def readModel(fname, ):
 
             - .bts, the file is assumed to be a TurbSim-format file.
 
+            - .pyts, the file is assumed to be a PyTurbSim npy
+              bundle (directory).
+
+            - .h5 or .hdf5, the file is assumed to be a PyTurbSim
+              HDF5 file (this requires h5py).
+
     Returns
     -------
     tsdata : :class:`tsdata <pyts.main.tsdata>`
@@ -32,7 +42,7 @@ def readModel(fname, ):
     """
 
     for sfx, rdr in readers.iteritems():
-        if fname.endswith(sfx):
+        if fname.rstrip('/\\').endswith(sfx):
             return rdr(fname)
 
     # Otherwise try reading it as a .wnd file.
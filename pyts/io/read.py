@@ -1,12 +1,19 @@
 from struct import unpack
-from .base import e, checkname, convname
+from .base import e, checkname, convname, outname, mmapArray, h5Array
 import numpy as np
 from ..main import tsdata
-from ..base import tsGrid
+from ..base import tsGrid, gridObj, ts_float
 from warnings import warn
+import json
+import time
+import os
+try:
+    import h5py
+except ImportError:
+    h5py = None
 
 
-def bladed(fname,):
+def bladed(fname, mmap=True):
     """
     Read Bladed format (.wnd, .bl) full-field time-series binary data files.
 
@@ -14,6 +21,11 @@ def bladed(fname,):
     ----------
     fname : str
             The filename from which to read the data.
+    mmap : bool, optional (True)
+           If True, the velocity data is not loaded into memory;
+           instead :attr:`tsdata.uturb` is a lazy view of a
+           memory-map of the file (see :class:`mmapArray
+           <pyts.io.base.mmapArray>`).
 
     Returns
     -------
@@ -33,15 +45,11 @@ def bladed(fname,):
         fl.seek(12, 1)  # Unused bytes
         clockwise, randseed, n_z, n_y = unpack(e + '4l', fl.read(16))
         fl.seek(24, 1)  # Unused bytes
-        nbt = ncomp * n_y * n_z * n_t
-        dat = np.rollaxis(np.fromstring(fl.read(2 * nbt), dtype=np.int16)
-                          .astype(np.float32).reshape([ncomp,
-                                                       n_y,
-                                                       n_z,
-                                                       n_t], order='F'),
-                          2, 1)
-    dat[0] += 1000.0 / ti[0]
-    dat /= 1000. / (uhub * ti[:, None, None, None])
+        # The data is ordered: component (fastest), y, z, time (slowest).
+        dat = np.memmap(fl, dtype=e + 'i2', mode='r', offset=fl.tell(),
+                        shape=(n_t, n_z, n_y, ncomp)).transpose(3, 1, 2, 0)
+    offset = np.array([-1000.0 / ti[0], 0, 0])[:ncomp]
+    scale = (1000. / (uhub * ti))[:ncomp]
     # Create the grid object:
     dt = dx / uhub
     # Determine the clockwise value.
@@ -69,13 +77,10 @@ def bladed(fname,):
                   dy=dy, dz=dz,
                   dt=dt, nt=n_t,
                   clockwise=clockwise)
-    out = tsdata(grid)
-    out.uprof = dat.mean(-1)
-    out.uturb = dat - out.uprof[:, :, :, None]
-    return out
+    return _tsdata(grid, dat, offset, scale, mmap)
 
 
-def turbsim(fname):
+def turbsim(fname, mmap=True):
     """
     Read TurbSim format (.bts) full-field time-series binary
     data files.
@@ -84,6 +89,11 @@ def turbsim(fname):
     ----------
     fname : str
             The filename from which to read the data.
+    mmap : bool, optional (True)
+           If True, the velocity data is not loaded into memory;
+           instead :attr:`tsdata.uturb` is a lazy view of a
+           memory-map of the file (see :class:`mmapArray
+           <pyts.io.base.mmapArray>`).
 
     Returns
     -------
@@ -116,22 +126,159 @@ def turbsim(fname):
     center = z0 + (n_z - 1) * dz / 2.0
     #print fname, u_scl, u_off
     desc_str = fl.read(strlen)  # skip these bytes.
-    nbt = 3 * n_y * n_z * n_t
-    dat = np.rollaxis(np.fromstring(fl.read(2 * nbt), dtype=np.int16).astype(
-        np.float32).reshape([3, n_y, n_z, n_t], order='F'), 2, 1)
-    dat -= u_off[:, None, None, None]
-    dat /= u_scl[:, None, None, None]
+    # The data is ordered: component (fastest), y, z, time (slowest).
+    dat = np.memmap(fl, dtype=e + 'i2', mode='r', offset=fl.tell(),
+                    shape=(n_t, n_z, n_y, 3)).transpose(3, 1, 2, 0)
+    fl.close()
     # Create the tsdata object.
     grid = tsGrid(center=center,
                   ny=n_y, nz=n_z,
                   dy=dy, dz=dz,
                   dt=dt, nt=n_t, )
+    return _tsdata(grid, dat, u_off, u_scl, mmap)
+
+
+def _tsdata(grid, dat, offset, scale, mmap=True):
+    """
+    Create a :class:`tsdata <pyts.main.tsdata>` object from the int16
+    (component, z, y, time) array `dat`, with the velocity
+    ``(dat - offset) / scale``.
+
+    The mean velocity profile is computed in one pass over `dat`. If
+    `mmap` is False the turbulence is loaded into memory, otherwise it
+    is a lazy :class:`mmapArray <pyts.io.base.mmapArray>`.
+    """
     out = tsdata(grid)
-    out.uprof = dat.mean(-1)
-    out.uturb = dat - out.uprof[:, :, :, None]
+    out.uprof = mmapArray(dat, offset, scale).tmean()
+    out.uturb = mmapArray(dat, offset, scale, mean=out.uprof)
+    if not mmap:
+        out.uturb = np.asarray(out.uturb)
     return out
 
 
+def _grid(y, z, dt, n_t, n_t_out, clockwise=True):
+    """
+    Create the grid object of a PyTurbSim (npy or HDF5) file.
+    """
+    grid = gridObj()
+    grid.y = np.asarray(y, dtype=ts_float)
+    grid.z = np.asarray(z, dtype=ts_float)
+    grid.dt = float(dt)
+    grid.n_t = int(n_t)
+    grid.n_t_out = int(n_t_out)
+    grid.time_sec = grid.n_t * grid.dt
+    grid.f = np.arange(grid.n_f, dtype=ts_float) * grid.df + grid.df
+    grid.clockwise = bool(clockwise)
+    return grid
+
+
+def _info(info):
+    """
+    Restore the :attr:`tsdata.info` dict that was stored (as JSON) in
+    a PyTurbSim (npy or HDF5) file.
+    """
+    if 'StartTime' in info:
+        info['StartTime'] = time.struct_time(info['StartTime'])
+    return info
+
+
+def npy(fname, mmap=True):
+    """
+    Read PyTurbSim npy bundles (written by :func:`write.npy
+    <pyts.io.write.npy>`).
+
+    Parameters
+    ----------
+    fname : str
+            The bundle (directory) from which to read the data.
+    mmap : bool, optional (True)
+           If True, the velocity data is not loaded into memory;
+           instead :attr:`tsdata.uturb` is a (read-only)
+           :class:`numpy.memmap` of the file. No scaling is needed,
+           so no data is copied until it is used.
+
+    Returns
+    -------
+    tsdata : :class:`tsdata <pyts.main.tsdata>`
+             The TurbSim data contained in the bundle. Its `info`
+             (random seed, model names and parameters, etc.) is
+             restored from the bundle.
+
+    """
+    if not os.path.isdir(fname):
+        fname = outname(fname, '.pyts')
+    if not os.path.isfile(os.path.join(fname, 'info.json')):
+        raise IOError("The path %s does not appear to be a valid "
+                      "PyTurbSim npy bundle." % fname)
+    with open(os.path.join(fname, 'info.json'), 'r') as fl:
+        meta = json.load(fl)
+    uturb = np.load(os.path.join(fname, 'uturb.npy'),
+                    mmap_mode='r' if mmap else None)
+    gp = meta['grid']
+    grid = _grid(np.load(os.path.join(fname, 'y.npy')),
+                 np.load(os.path.join(fname, 'z.npy')),
+                 gp['dt'], gp['n_t'], uturb.shape[-1], gp['clockwise'])
+    # Create the tsdata object.
+    out = tsdata(grid)
+    out.uprof = np.load(os.path.join(fname, 'uprof.npy'))
+    out.uturb = uturb
+    out.info = _info(meta['info'])
+    return out
+
+
+if h5py is not None:
+
+    def hdf5(fname, lazy=True):
+        """
+        Read PyTurbSim HDF5 files (written by :func:`write.hdf5
+        <pyts.io.write.hdf5>`).
+
+        Parameters
+        ----------
+        fname : str
+                The filename from which to read the data.
+        lazy : bool, optional (True)
+               If True, the velocity data is not loaded into memory;
+               instead :attr:`tsdata.uturb` is a lazy view of the
+               dataset in the (open) file (see :class:`h5Array
+               <pyts.io.base.h5Array>`). Close the file with
+               :meth:`tsdata.close <pyts.main.tsdata.close>` (or use
+               the tsdata object in a `with` statement).
+
+        Returns
+        -------
+        tsdata : :class:`tsdata <pyts.main.tsdata>`
+                 The TurbSim data contained in the file. Its `info`
+                 (random seed, model names and parameters, etc.) is
+                 restored from the file.
+
+        """
+        fname = checkname(outname(fname, '.h5'), ['.h5', '.hdf5'])
+        fl = h5py.File(fname, mode='r')
+        if 'uturb' not in fl:
+            fl.close()
+            raise IOError("The file %s does not appear to be a valid "
+                          "PyTurbSim HDF5 file." % fname)
+        n_t_out = fl['uturb'].shape[-1]
+        grid = _grid(fl['y'][:], fl['z'][:], fl.attrs['dt'],
+                     fl.attrs.get('n_t', n_t_out), n_t_out,
+                     fl.attrs.get('clockwise', True))
+        # Create the tsdata object.
+        out = tsdata(grid)
+        out.uprof = fl['uprof'][:]
+        if lazy:
+            out.uturb = h5Array(fl['uturb'])
+            out._file = fl
+        else:
+            out.uturb = fl['uturb'][:]
+        out.info = _info(json.loads(fl.attrs.get('info', '{}')))
+        if 'RandSeed' in fl.attrs:
+            out.info['RandSeed'] = int(fl.attrs['RandSeed'])
+        if not lazy:
+            fl.close()
+        return out
+
+
 def sum_scan(filename,):
     """
     Scan a sum file for specific variables.
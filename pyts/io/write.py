@@ -4,18 +4,45 @@ This module is for writing PyTurbSim data objects to various formats.
 The functions in this module were translated directly from the
 original TSsubs.f90 file.
 """
-from .base import convname
+from .base import convname, stripinp, outname
 import numpy as np
 from struct import pack
 from .base import e
 from .. import _version as ver
 import time
+import json
+import os
+from multiprocessing import Process, cpu_count, current_process
+import sys
 from .sum import write as sum  # Make sum.write available here.
 try:
     import h5py
 except ImportError:
     h5py = None
 
+#: The (approximate) size, in bytes, of the time-chunks of the
+#: velocity field that the binary writers process at once.
+chunk_bytes = 2 ** 24
+
+
+def _iter_tchunks(tsdat):
+    """
+    Iterate over time-slices of `tsdat` that each contain (roughly)
+    :data:`chunk_bytes` of float64 data.
+    """
+    n_t = tsdat.shape[-1]
+    step = max(chunk_bytes // (8 * int(np.prod(tsdat.shape[:-1]))), 1)
+    for i0 in xrange(0, n_t, step):
+        yield slice(i0, min(i0 + step, n_t))
+
+
+def _utotal(tsdat, slc):
+    """
+    The total (mean + turbulent) velocity of `tsdat` for the
+    time-slice `slc`.
+    """
+    return tsdat.uturb[..., slc] + tsdat.uprof[:, :, :, None]
+
 
 def bladed(fname, tsdat):
     """Write TurbSim output to a Bladed-format (.wnd) binary file.
@@ -35,8 +62,8 @@ def bladed(fname, tsdat):
     prms = tsdat.parameters
     lat = prms.get('Latitude', 0.0)
     Z0 = prms.get('Z0', 0.0)
-    ts = tsdat.utotal
-    ti = np.sqrt(tsdat.tke[:, tsdat.ihub[0], tsdat.ihub[1]]) / tsdat.UHUB
+    ihub = tsdat.ihub
+    ti = np.sqrt((tsdat.uturb[:, ihub[0], ihub[1]] ** 2).mean(-1)) / tsdat.UHUB
     ti[ti < 1e-5] = 1
     scale = 1000. / (tsdat.UHUB * ti[:, None, None, None])
     off = np.array([1000. / (ti[0]), 0, 0])[:, None, None, None]
@@ -67,22 +94,19 @@ def bladed(fname, tsdat):
                   tsdat.grid.n_z,
                   tsdat.grid.n_y))
     fl.write(pack(e + '6l', *([0] * 6)))  # Unused bytes
-    if tsdat.grid.clockwise:
-        out = (ts[:, :, ::-1, :] * scale - off).astype(np.int16)
-    else:
-        out = (ts[:, :, :, :] * scale - off).astype(np.int16)
-    # Swap the y and z indices so that fortran-order writing agrees with the
-    # file format.
-    out = np.rollaxis(out, 2, 1)
-    # Write the data so that the first index varies fastest (F order).
-    # With the swap of y and z indices above, the indexes vary in the following
-    # (decreasing) order:
+    # The data is written one time-chunk at a time. In the file the
+    # indexes vary in the following (decreasing) order:
     # component (fastest), y-index, z-index, time (slowest).
-    fl.write(out.tostring(order='F'))
+    for slc in _iter_tchunks(tsdat):
+        ts = _utotal(tsdat, slc)
+        if tsdat.grid.clockwise:
+            ts = ts[:, :, ::-1, :]
+        out = (ts * scale - off).astype(np.int16)
+        fl.write(out.transpose(3, 1, 2, 0).tostring())
     fl.close()
 
 
-def formatted(fname, tsdat):
+def formatted(fname, tsdat, nproc=None):
     """Write the data to a set of TurbSim 'formatted' (readable) files (.u, .v, .w).
 
     Parameters
@@ -92,6 +116,20 @@ def formatted(fname, tsdat):
             '.u', '.v', '.w' will be appended to fname for each file.
     tsdat : :class:`tsdata <pyts.main.tsdata>`
              The 'tsdata' object that contains the data.
+    nproc : int, optional (number of components, or cores)
+            The number of processes that write the component files
+            (1 writes them in this process). On Windows the default
+            is 1, because each process receives a copy of the data.
+            The files are always written in this process if it is a
+            daemon (e.g. a :mod:`multiprocessing` pool worker), which
+            cannot start processes.
+
+    Notes
+    -----
+
+    Many timesteps are formatted by each (%-style) string
+    operation. The output is identical to formatting each value
+    with ``'{: 7.3f}'``.
 
     """
 
@@ -119,26 +157,73 @@ def formatted(fname, tsdat):
                                      uhub=tsdat.UHUB,
                                      zcoords=(' {: 7.3f}' * tsdat.grid.n_z).format(*tsdat.z),
                                      ycoords=(' {: 7.3f}' * tsdat.grid.n_y).format(*tsdat.y), ))
+    # '% 7.3f' produces the same text as '{: 7.3f}'.
     outform = ("\n"
-               "  {: 7.3f} {: 7.3f}\n")
-    outform += (' ' + (' {: 7.3f}' * tsdat.grid.n_y) + '\n') * tsdat.grid.n_z
+               "  % 7.3f % 7.3f\n")
+    outform += (' ' + (' % 7.3f' * tsdat.grid.n_y) + '\n') * tsdat.grid.n_z
 
-    fname = fname.rstrip('.inp')
+    fname = stripinp(fname)
+
+    # The time and hub-height velocity are computed once:
+    tm = tsdat.time
+    ihub = tsdat.ihub
+    uhub = tsdat.uturb[0][ihub] + tsdat.uprof[0][ihub]
+    if current_process().daemon:
+        nproc = 1
+    elif nproc is None:
+        if sys.platform.startswith('win'):
+            nproc = 1
+        else:
+            nproc = min(tsdat.n_comp, cpu_count())
 
     print("Writing formatted files...")
+    procs = []
     for idc in range(tsdat.n_comp):
         comp = tsdat.comp_name[idc]
-        print("{}-component, timestep:".format(comp))
-        fl = open(fname + '.' + comp, 'w')
-        fl.write(header % (comp))
-        nt = tsdat.time.shape[0]
-        for idt in range(nt):
-            if idt % 1000 == 0:
-                print('{}/{}'.format(idt, nt))
-            fl.write(outform.format(tsdat.time[idt],
-                                    tsdat.uhub[idt],
-                                    *tsdat.uturb[idc, :, :, idt].flatten()))
-        fl.close()
+        args = (fname + '.' + comp, header % (comp), outform,
+                tm, uhub, tsdat.uturb[idc])
+        if nproc == 1:
+            _formatted_comp(*args)
+            continue
+        procs.append(Process(target=_formatted_comp, args=args))
+        procs[-1].start()
+        if len(procs) == nproc:
+            _join(procs.pop(0))
+    for prc in procs:
+        _join(prc)
+
+
+def _join(prc):
+    """
+    Wait for the process `prc`, and raise an error if it failed.
+    """
+    prc.join()
+    if prc.exitcode != 0:
+        raise IOError("Writing a formatted file failed (exit code {}).".format(prc.exitcode))
+
+
+def _formatted_comp(fname, header, outform, tm, uhub, uturb):
+    """
+    Write one component file of :func:`formatted`.
+
+    Each block of timesteps is written with one %-format operation
+    (of `outform` repeated for each timestep).
+    """
+    print("{}, timestep:".format(fname))
+    nt = tm.shape[0]
+    # The number of values per timestep:
+    n_val = 2 + uturb.shape[0] * uturb.shape[1]
+    step = max(chunk_bytes // (32 * n_val), 1)
+    with open(fname, 'w') as fl:
+        fl.write(header)
+        for i0 in xrange(0, nt, step):
+            print('{}/{}'.format(i0, nt))
+            i1 = min(i0 + step, nt)
+            vals = np.empty((i1 - i0, n_val))
+            vals[:, 0] = tm[i0:i1]
+            vals[:, 1] = uhub[i0:i1]
+            vals[:, 2:] = uturb[..., i0:i1].reshape(n_val - 2, i1 - i0).T
+            fl.write((outform * (i1 - i0)) % tuple(vals.ravel().tolist()))
 
 
 def turbsim(fname, tsdat):
@@ -152,7 +237,6 @@ def turbsim(fname, tsdat):
              The 'tsdata' object that contains the data.
 
     """
-    ts = tsdat.utotal
     intmin = -32768
     intrng = 65536
     u_minmax = np.empty((3, 2), dtype=np.float32)
@@ -162,16 +246,19 @@ def turbsim(fname, tsdat):
         ver.__prog_name__,
         ver.__version__,
         time.strftime('%b %d, %Y, %H:%M (%Z)', time.localtime()))
-    # Calculate the ranges:
-    out = np.empty(tsdat.shape, dtype=np.int16)
+    # Calculate the ranges (in one pass over the data):
+    u_minmax[:, 0] = np.inf
+    u_minmax[:, 1] = -np.inf
+    for slc in _iter_tchunks(tsdat):
+        ts = _utotal(tsdat, slc).reshape(3, -1)
+        u_minmax[:, 0] = np.minimum(u_minmax[:, 0], ts.min(-1))
+        u_minmax[:, 1] = np.maximum(u_minmax[:, 1], ts.max(-1))
     for ind in range(3):
-        u_minmax[ind] = ts[ind].min(), ts[ind].max()
         if u_minmax[ind][0] == u_minmax[ind][1]:
             u_scl[ind] = 1
         else:
             u_scl[ind] = intrng / np.diff(u_minmax[ind])
         u_off[ind] = intmin - u_scl[ind] * u_minmax[ind, 0]
-        out[ind] = (ts[ind] * u_scl[ind] + u_off[ind]).astype(np.int16)
     fl = file(convname(fname, '.bts'), 'wb')
     fl.write(pack(e + 'h4l12fl',
                   7,
@@ -193,40 +280,208 @@ def turbsim(fname, tsdat):
                   u_off[2],
                   len(desc_str)))
     fl.write(desc_str)
-    # Swap the y and z indices so that fortran-order writing agrees with the file format.
-    # Also, we swap the order of z-axis to agree with the file format.
-    # Write the data so that the first index varies fastest (F order).
-    # The indexes vary in the following order:
+    # The data is quantized and written one time-chunk at a time. In
+    # the file the indexes vary in the following order:
     # component (fastest), y-index, z-index, time (slowest).
-    fl.write(np.rollaxis(out, 2, 1).tostring(order='F'))
+    for slc in _iter_tchunks(tsdat):
+        ts = _utotal(tsdat, slc)
+        out = np.empty(ts.shape, dtype=np.int16)
+        for ind in range(3):
+            out[ind] = (ts[ind] * u_scl[ind] + u_off[ind]).astype(np.int16)
+        fl.write(out.transpose(3, 1, 2, 0).tostring())
     fl.close()
 
 
+def _json_default(obj):
+    # Numpy arrays and scalars become lists and numbers, times become
+    # lists, anything else becomes its string representation.
+    if isinstance(obj, time.struct_time):
+        return list(obj)
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()
+    return str(obj)
+
+
+def npy_uturb(fname, shape, dtype):
+    """
+    Create the (uninitialized) turbulence velocity array of a
+    PyTurbSim npy bundle (see :func:`npy`).
+
+    Parameters
+    ----------
+    fname : str
+            The bundle (directory) name. `.inp` will always be
+            stripped, and `.pyts` will be added if no file extension
+            exists.
+    shape : tuple
+            The shape of the array (3 x n_z x n_y x n_t).
+    dtype : numpy dtype
+            The dtype of the array.
+
+    Returns
+    -------
+    uturb : :class:`numpy.memmap`
+            A writable memory-map of the array in the bundle.
+
+    """
+    fname = outname(fname, '.pyts')
+    if not os.path.isdir(fname):
+        os.makedirs(fname)
+    return np.lib.format.open_memmap(os.path.join(fname, 'uturb.npy'),
+                                     mode='w+', dtype=dtype, shape=tuple(shape))
+
+
+def npy(fname, tsdat):
+    """Write the data to a PyTurbSim npy bundle.
+
+    The bundle is a directory that contains:
+
+    - 'uturb.npy', 'uprof.npy', 'y.npy' and 'z.npy': the turbulence
+      velocity, mean profile and grid as .npy files. The velocity is
+      stored without any scaling, with the dtype and (component, z,
+      y, time) layout of the array in memory, so that :func:`read.npy
+      <pyts.io.read.npy>` can memory-map it without copying.
+
+    - 'info.json': the grid parameters (dt, n_t, n_t_out and
+      clockwise) and :attr:`tsdata.info` (random seed, model names and
+      parameters, etc.).
+
+    Parameters
+    ----------
+    fname : str
+            The bundle (directory) name to which the data should be
+            written. `.inp` will always be stripped, and `.pyts` will
+            be added if no file extension exists.
+    tsdat : :class:`tsdata <pyts.main.tsdata>`
+             The 'tsdata' object that contains the data.
+
+    Notes
+    -----
+
+    If :attr:`tsdat.uturb` is already the velocity array of the
+    bundle (see :func:`npy_uturb` and :meth:`tsrun.run
+    <pyts.main.tsrun.run>`), only the other files are written.
+
+    """
+    fname = outname(fname, '.pyts')
+    fname_uturb = os.path.join(fname, 'uturb.npy')
+    uturb = tsdat.uturb
+    if (isinstance(uturb, np.memmap) and uturb.filename is not None and
+            os.path.abspath(uturb.filename) == os.path.abspath(fname_uturb)):
+        uturb.flush()
+    else:
+        out = npy_uturb(fname, tsdat.shape, uturb.dtype)
+        for slc in _iter_tchunks(tsdat):
+            out[..., slc] = uturb[..., slc]
+        out.flush()
+        del out
+    np.save(os.path.join(fname, 'uprof.npy'), np.asarray(tsdat.uprof))
+    np.save(os.path.join(fname, 'y.npy'), tsdat.y)
+    np.save(os.path.join(fname, 'z.npy'), tsdat.z)
+    with open(os.path.join(fname, 'info.json'), 'w') as fl:
+        json.dump(dict(grid=dict(dt=tsdat.dt,
+                                 n_t=tsdat.grid.n_t,
+                                 n_t_out=tsdat.shape[-1],
+                                 clockwise=bool(tsdat.grid.clockwise)),
+                       info=getattr(tsdat, 'info', {}),
+                       version=ver.__version__),
+                  fl, default=_json_default, indent=1)
+
+
+#: The (approximate) size, in bytes, of the chunks of the velocity
+#: data in HDF5 files.
+h5_chunk_bytes = 2 ** 20
+
+
 if h5py is not None:
 
-    def hdf5(fname, tsdat):
-        """Write the data to an hdf5 format file.
+    class hdf5Writer(object):
+
+        """
+        Write PyTurbSim data to an HDF5 file incrementally, one
+        time-chunk at a time (e.g. the chunks of :meth:`tsrun.stream
+        <pyts.main.tsrun.stream>`), so that the full velocity field is
+        never held in memory.
+
+        The turbulence velocity is stored in the 'uturb' dataset
+        (component, z, y, time), with chunks that hold every
+        grid-point and component for a block of timesteps (of roughly
+        :data:`h5_chunk_bytes`), so that reading a time-slab reads
+        only the chunks that contain it. The mean profile ('uprof'),
+        grid ('y', 'z', 'time' and the 'dt', 'n_t' and 'clockwise'
+        attributes), random seed ('RandSeed' attribute) and model
+        information ('info' attribute, a JSON string) are stored with
+        it. Use :func:`read.hdf5 <pyts.io.read.hdf5>` to read the
+        file.
 
         Parameters
         ----------
         fname : str
-                the filename to which the data should be written. `.inp`
-                will always be stripped, and `.h5` will be added if no
-                file extension exists.
-        tsdat : :class:`tsdata <pyts.main.tsdata>`
-                 The 'tsdata' object that contains the data.
+                The filename to which the data should be written.
+                `.inp` will always be stripped, and `.h5` will be
+                added if no file extension exists.
+        chunk_t : int, optional
+                  The number of timesteps in each chunk of the file
+                  (default: :data:`h5_chunk_bytes` of data).
+        compression : str or int, optional (None)
+                  The compression filter: 'gzip', 'lzf', or an int
+                  (0-9: the gzip level).
+        shuffle : bool, optional (True if `compression` is set)
+                  Apply the shuffle filter before compression (this
+                  usually improves the compression of float data).
+        dtype : numpy dtype, optional (the dtype of uturb)
+                The dtype of the velocity data in the file.
+
+        Examples
+        --------
+        ::
+
+            with hdf5Writer('stream.h5', compression='lzf') as wr:
+                for chunk in tsr.stream(chunk_sec=60, n_chunks=60):
+                    wr.append(chunk)
 
         """
-        fname = fname.rstrip('.inp')
-        if '.' not in (fname.split('/')[-1]).split('\\')[-1]:
-            fname += '.h5'
-        with h5py.File(fname, mode='w') as fl:
+
+        def __init__(self, fname, chunk_t=None, compression=None,
+                     shuffle=None, dtype=None):
+            self.fname = fname = outname(fname, '.h5')
+            self.chunk_t = chunk_t
+            self.compression = compression
+            if shuffle is None:
+                shuffle = compression is not None
+            self.shuffle = shuffle
+            self.dtype = dtype
+            self.n_t = 0
+            self._file = h5py.File(fname, mode='w')
+
+        def __enter__(self,):
+            return self
+
+        def __exit__(self, type, value, trace):
+            self.close()
+
+        def _create(self, tsdat):
+            fl = self._file
+            shp = tuple(tsdat.shape[:-1])
+            dtype = self.dtype
+            if dtype is None:
+                dtype = tsdat.uturb.dtype
+            dtype = np.dtype(dtype)
+            chunk_t = self.chunk_t
+            if chunk_t is None:
+                chunk_t = max(h5_chunk_bytes //
+                              (dtype.itemsize * int(np.prod(shp))), 1)
             # The turbulence velocity:
-            ds_uturb = fl.create_dataset('uturb', data=tsdat.uturb)
+            ds_uturb = fl.create_dataset('uturb', shape=shp + (0, ),
+                                         maxshape=shp + (None, ),
+                                         chunks=shp + (chunk_t, ),
+                                         dtype=dtype,
+                                         compression=self.compression,
+                                         shuffle=self.shuffle)
             ds_uturb.attrs.create('units', 'm/s')
             ds_uturb.attrs.create('dims', ['u,v,w', 'z', 'y', 'time'])
             # The mean velocity profile:
-            ds_uprof = fl.create_dataset('uprof', data=tsdat.uprof)
+            ds_uprof = fl.create_dataset('uprof', data=np.asarray(tsdat.uprof))
             ds_uprof.attrs.create('units', 'm/s')
             ds_uprof.attrs.create('dims', ['u,v,w', 'z', 'y'])
             # The spatial grid:
@@ -235,5 +490,76 @@ if h5py is not None:
             ds_y = fl.create_dataset('y', data=tsdat.y)
             ds_y.attrs.create('units', 'm')
             # The time vector:
-            ds_time = fl.create_dataset('time', data=tsdat.time)
+            ds_time = fl.create_dataset('time', shape=(0, ), maxshape=(None, ),
+                                        chunks=(max(chunk_t, 1024), ),
+                                        dtype=np.float64)
             ds_time.attrs.create('units', 'sec')
+            fl.attrs['dt'] = tsdat.dt
+            fl.attrs['n_t'] = tsdat.grid.n_t
+            fl.attrs['clockwise'] = bool(tsdat.grid.clockwise)
+            info = getattr(tsdat, 'info', {})
+            if info.get('RandSeed') is not None:
+                fl.attrs['RandSeed'] = info['RandSeed']
+            fl.attrs['info'] = json.dumps(info, default=_json_default)
+            fl.attrs['version'] = ver.__version__
+
+        def append(self, tsdat):
+            """
+            Append the timeseries of `tsdat` (a :class:`tsdata
+            <pyts.main.tsdata>` object) to the file.
+
+            The grid, mean profile and model information are taken
+            from the first object that is appended.
+            """
+            if 'uturb' not in self._file:
+                self._create(tsdat)
+            ds_uturb = self._file['uturb']
+            ds_time = self._file['time']
+            if tuple(tsdat.shape[:-1]) != ds_uturb.shape[:-1]:
+                raise ValueError("The grid of the data (%s) does not match "
+                                 "the grid of the file (%s)."
+                                 % (tsdat.shape[:-1], ds_uturb.shape[:-1]))
+            n_t = tsdat.shape[-1]
+            i0 = self.n_t
+            ds_uturb.resize(i0 + n_t, axis=3)
+            ds_time.resize(i0 + n_t, axis=0)
+            ds_time[i0:] = (i0 + np.arange(n_t)) * tsdat.dt
+            for slc in _iter_tchunks(tsdat):
+                ds_uturb[..., i0 + slc.start:i0 + slc.stop] = tsdat.uturb[..., slc]
+            self.n_t += n_t
+            # The file holds at least as many timesteps as the data.
+            self._file.attrs['n_t'] = max(self._file.attrs['n_t'], self.n_t)
+
+        def close(self,):
+            """
+            Close the file.
+            """
+            self._file.close()
+
+    def hdf5(fname, tsdat, chunk_t=None, compression=None, shuffle=None,
+             dtype=None):
+        """Write the data to an hdf5 format file.
+
+        Parameters
+        ----------
+        fname : str
+                the filename to which the data should be written. `.inp`
+                will always be stripped, and `.h5` will be added if no
+                file extension exists.
+        tsdat : :class:`tsdata <pyts.main.tsdata>`, or iterable
+                 The 'tsdata' object that contains the data, or an
+                 iterable of them (e.g. :meth:`tsrun.stream
+                 <pyts.main.tsrun.stream>`) that are written one after
+                 another.
+
+        The remaining parameters are those of :class:`hdf5Writer`
+        (chunking, compression, etc.). The data is written one
+        time-chunk at a time.
+
+        """
+        with hdf5Writer(fname, chunk_t=chunk_t, compression=compression,
+                        shuffle=shuffle, dtype=dtype) as wr:
+            if hasattr(tsdat, 'uturb'):
+                tsdat = [tsdat]
+            for dat in tsdat:
+                wr.append(dat)
@@ -8,7 +8,7 @@ typical user will want access to. For a more compact version of the
 PyTurbSim interface import the ./api.py package.
 
 """
-from .base import ts_complex, gridProps, dbg, np, statObj
+from .base import ts_complex, gridProps, dbg, np, statObj, tslib, totalArray
 from .profModels.base import profModelBase, profObj
 from .specModels.base import specModelBase, specObj
 from .cohereModels.base import cohereModelBase, cohereObj, cohereUser
@@ -16,9 +16,12 @@ from .stressModels.base import stressModelBase, stressObj
 from .phaseModels.api import randPhase
 import _version as ver
 from .io import write
+from .misc import parse_bytes
+from .moments import tsMoments
 from numpy import random
-from numpy import ulonglong
-from numpy.fft import irfft
+from numpy import ulonglong, float32, float64, complex128, sin
+from .fftlib import get_backend
+from warnings import warn
 import time
 
 # !!!VERSION_INCONSISTENCY
@@ -69,13 +72,61 @@ class tsrun(object):
     RandSeed : int,optional ('random value')
                Initialize the run-object with a RandSeed.
     ncore : int,optional (1)
-            Number of cores (processors) to use for the pyTurbSim run
+            Number of cores (processors) to use for the pyTurbSim
+            run. This is the number of threads used by the tslib
+            kernels, and by the inverse FFT. Values less than 1 use
+            all cores.
+    mem_limit : int or str,optional (None)
+            The approximate maximum memory (e.g. '4GB') that the run
+            should use. If this is specified, the phases are
+            computed, correlated and scaled in blocks of frequencies
+            that are sized to fit within this limit. Note that the
+            :class:`randPhase <pyts.phaseModels.main.randPhase>`
+            phases are drawn block-by-block, so a 'chunked' run
+            produces a different realization than an unchunked run
+            with the same `RandSeed`. The :class:`philoxPhase
+            <pyts.phaseModels.main.philoxPhase>` phase model (set
+            :attr:`phase`) does not have this limitation.
+    cohere_cache : :class:`factorCache <pyts.cohereModels.cache.factorCache>`,optional (None)
+            A cache of coherence-matrix factors. Runs that share
+            a cache, and differ only in their `RandSeed`, reuse the
+            factors rather than recomputing them.
+    parallel : str {'freq', 'blas'},optional ('freq')
+            How the tslib coherence kernels use threads. 'freq'
+            distributes the frequencies across `ncore` threads.
+            'blas' factors one frequency at a time, so that a
+            threaded BLAS (set e.g. OPENBLAS_NUM_THREADS) is used
+            within each frequency; this is faster for large grids,
+            and requires that tslib is linked against a system LAPACK
+            (see setup.py).
+    precision : str {'double', 'mixed'},optional ('double')
+            The precision of the output timeseries. The spectra,
+            phases and spectrum buffer are always single precision
+            (float32/complex64), and the coherence factorization
+            falls back to double precision at frequencies where the
+            single-precision factorization fails. 'double' returns a
+            float64 timeseries. 'mixed' keeps the timeseries float32
+            end-to-end (half the memory of the largest array), using
+            a single-precision inverse FFT if the `fft` backend has
+            one. With 'double', the inverse FFT is always computed in
+            double precision (whichever backend is used).
+    fft : str {'auto', 'numpy', 'fftw'},optional ('auto')
+            The inverse-FFT backend (see :mod:`pyts.fftlib`). 'auto'
+            selects 'fftw' if pyFFTW is installed, otherwise
+            'numpy'. To choose the number of timesteps from the
+            measured speed of this backend, pass it to
+            :func:`tsGrid <pyts.base.tsGrid>` as well.
 
     """
-    def __init__(self, RandSeed=None, ncore=1):
+    def __init__(self, RandSeed=None, ncore=1, mem_limit=None,
+                 cohere_cache=None, parallel='freq', precision='double',
+                 fft='auto'):
         """
         PyTurbSim 'run' objects can be initialized with a specific
-        random seed, `RandSeed`, and number of cores, `ncore`.
+        random seed, `RandSeed`, number of cores, `ncore`, memory
+        limit, `mem_limit`, coherence-factor cache, `cohere_cache`,
+        threading of the coherence kernels, `parallel`, output
+        precision, `precision`, and inverse-FFT backend, `fft`.
         """
         # Initialize the random number generator before doing anything else.
         if RandSeed is None:
@@ -86,14 +137,48 @@ class tsrun(object):
         # negative seeds.  In order to attempt to be consistent, we
         # use the values in the files but make them positive for the
         # numpy random generator.
-        self.randgen = random.RandomState(
-            ulonglong(self.RandSeed + 2147483648))
+        self.randgen = self._randstate(self.RandSeed)
         self.ncore = ncore
+        self.mem_limit = mem_limit
+        self.cohere_cache = cohere_cache
+        if parallel not in ['freq', 'blas']:
+            raise ValueError("parallel must be 'freq' or 'blas'.")
+        self.parallel = parallel
+        if precision not in ['double', 'mixed']:
+            raise ValueError("precision must be 'double' or 'mixed'.")
+        self.precision = precision
+        self.fft = fft
         if dbg:
             self.timer = dbg.timer('Veers84')
     # For now this is a place-holder, I may want to make this an
-    # 'input property' eventually.
+    # 'input property' eventually. randPhase reproduces the
+    # TurbSim-style (RandomState) phases; set this to a philoxPhase
+    # instance for phases that do not depend on blocking/threading.
     phase = randPhase()
+    # The index of the segment of a :meth:`stream` (used by
+    # counter-based phase models, so that segments are independent).
+    _segment = 0
+
+    @staticmethod
+    def _randstate(seed):
+        """
+        Create the random number generator for the (TurbSim) `seed`.
+        """
+        return random.RandomState(ulonglong(seed + 2147483648))
+
+    @property
+    def fft(self):
+        """
+        The inverse-FFT backend (an :class:`fftBackend
+        <pyts.fftlib.fftBackend>`).
+
+        This can be set with a backend name or instance.
+        """
+        return self._fft
+
+    @fft.setter
+    def fft(self, val):
+        self._fft = get_backend(val)
 
     @property
     def prof(self):
@@ -442,7 +527,7 @@ class tsrun(object):
         out['RunTime'] = time.time() - time.mktime(self._starttime)
         return out
 
-    def run(self,):
+    def run(self, out=None):
         """
         Run PyTurbSim.
 
@@ -454,18 +539,193 @@ class tsrun(object):
         - :attr:`tsrun.cohere`: The coherence model, object or array.
         - :attr:`tsrun.stress`: The Reynold's stress model, object or array.
 
+        Parameters
+        ----------
+        out : str, optional (None)
+              The name of a PyTurbSim npy bundle (see :func:`write.npy
+              <pyts.io.write.npy>`). If this is specified, the
+              timeseries is computed directly into a memory-map of the
+              bundle's velocity file (rather than an array in memory),
+              and the bundle is written.
+
         Returns
         -------
         tsdata : :class:`tsdata`
 
         """
         self._starttime = time.localtime()
-        self.timeseries = self._calcTimeSeries()
-        out = self._build_outdata()
-        return out
+        ts_out = None
+        if out is not None:
+            grid = self.grid
+            ts_out = write.npy_uturb(out, (grid.n_comp, grid.n_z, grid.n_y,
+                                           self._n_out), self._ts_dtype)
+        self.timeseries = self._calcTimeSeries(ts_out)
+        tsdat = self._build_outdata()
+        if out is not None:
+            write.npy(out, tsdat)
+        return tsdat
 
     __call__ = run
 
+    def run_seeds(self, seeds):
+        """
+        Run PyTurbSim once for each random seed in `seeds`.
+
+        The statistics (prof, spec, stress and cohere) are evaluated
+        once, and the coherence matrix at each frequency is factored
+        once and applied to the phases of all of the seeds at once
+        (as a matrix-matrix product). This is much faster than
+        performing a separate run for each seed.
+
+        Parameters
+        ----------
+        seeds : iterable of ints
+                The random seeds (see :attr:`RandSeed`).
+
+        Returns
+        -------
+        tsdata : generator of :class:`tsdata`
+                 Yields the output of each seed in turn.
+
+        Notes
+        -----
+
+        The spectrum buffer of every seed is held in memory at once,
+        so the memory required scales with the number of seeds. For
+        large grids use :attr:`mem_limit` (which accounts for the
+        number of seeds), or break `seeds` into smaller groups.
+
+        """
+        seeds = list(seeds)
+        grid = self.grid
+        randgens = [self._randstate(seed) for seed in seeds]
+        RandSeed, randgen = self.RandSeed, self.randgen
+        self._starttime = time.localtime()
+        tmp = np.zeros((len(seeds), grid.n_comp, grid.n_z, grid.n_y,
+                        grid.n_f + 1), dtype=ts_complex)
+        try:
+            for ifs in self._iter_fblocks(len(seeds)):
+                phases = np.empty((len(seeds), grid.n_comp, grid.n_p,
+                                   len(grid.f[ifs])), dtype=ts_complex)
+                for isd, rgen in enumerate(randgens):
+                    self.RandSeed = seeds[isd]
+                    self.randgen = self.stress.randgen = rgen
+                    phases[isd] = self.stress.calc_phases(
+                        self.phase(self, ifs, out=phases[isd]))
+                phases = self.cohere.calc_phases_multi(phases, ifs, seeds)
+                for isd in range(len(seeds)):
+                    self._scale_spec(tmp[isd], phases[isd], ifs)
+                del phases
+            for isd, seed in enumerate(seeds):
+                self.RandSeed, self.randgen = seed, randgens[isd]
+                self.timeseries = self._spec2ts(tmp[isd])
+                yield self._build_outdata()
+        finally:
+            self.RandSeed, self.randgen = RandSeed, randgen
+            if hasattr(self, '_stress'):
+                self.stress.randgen = randgen
+
+    def stream(self, chunk_sec=60., n_chunks=None):
+        """
+        Generate an endless (or `n_chunks` long) turbulence timeseries,
+        in chunks of `chunk_sec` seconds.
+
+        The timeseries is the overlap-add of independent segments
+        (realizations of this run's statistics), each
+        :attr:`grid.n_t <pyts.base.gridObj.n_t>` timesteps long. Each
+        segment is multiplied by a sine window and the segments
+        overlap by half, so that the squared windows sum to one: the
+        variances, spectra, coherence and Reynold's stresses of the
+        segments are preserved through the joins (correlations at
+        time lags that are a significant fraction of the segment
+        length are slightly reduced). Only one segment, half of the
+        previous one and one chunk are held in memory.
+
+        Parameters
+        ----------
+        chunk_sec : float, optional (60)
+                    The length of each chunk (seconds).
+        n_chunks :  int, optional (None)
+                    The number of chunks to generate (None: no limit).
+
+        Returns
+        -------
+        tsdata : generator of :class:`tsdata`
+                 Yields each chunk in turn. Chunk k starts at time
+                 ``k * chunk_sec`` (see ``tsdata.info['StreamTime']``).
+
+        Notes
+        -----
+
+        The grid's `time_sec` sets the segment length, and therefore
+        the lowest frequency in the spectra.
+
+        The coherence of every segment is computed from the same
+        statistics. Set :attr:`cohere_cache` so that the coherence
+        matrices are factored once, rather than once per segment.
+
+        Examples
+        --------
+        ::
+
+            for chunk in tsr.stream(chunk_sec=60):
+                ...
+
+        """
+        grid = self.grid
+        n_seg = grid.n_t
+        if n_seg % 2:
+            raise ValueError("Streaming requires an even number of timesteps (grid.n_t).")
+        hop = n_seg // 2
+        n_chunk = int(round(chunk_sec / grid.dt))
+        if n_chunk < 1:
+            raise ValueError("chunk_sec must be at least one timestep.")
+        win = sin(np.pi * (np.arange(n_seg) + 0.5) / n_seg).astype(self._ts_dtype)
+        # The grid of each chunk (its time-axis is the chunk):
+        cgrid = grid[:]
+        cgrid.n_t = cgrid.n_t_out = n_chunk
+        cgrid.time_sec = n_chunk * grid.dt
+        cgrid.f = np.arange(cgrid.n_f, dtype=grid.f.dtype) * cgrid.df + cgrid.df
+        cgrid.clockwise = grid.clockwise
+        self._starttime = time.localtime()
+        prev = None
+        ichunk = 0
+        nbuf = 0
+        try:
+            while n_chunks is None or ichunk < n_chunks:
+                seg = self._spec2ts(self._calcSpecBuffer(), full=True)
+                seg *= win
+                self._segment += 1
+                if prev is None:
+                    # The stream starts at the middle of the first
+                    # segment, so that every point is the sum of two.
+                    prev = seg[..., hop:].copy()
+                    continue
+                blk = prev + seg[..., :hop]
+                prev = seg[..., hop:].copy()
+                del seg
+                i0 = 0
+                while i0 < hop:
+                    if nbuf == 0:
+                        buf = np.empty(blk.shape[:-1] + (n_chunk, ), dtype=blk.dtype)
+                    n = min(hop - i0, n_chunk - nbuf)
+                    buf[..., nbuf:nbuf + n] = blk[..., i0:i0 + n]
+                    nbuf += n
+                    i0 += n
+                    if nbuf == n_chunk:
+                        out = tsdata(cgrid)
+                        out.uturb = buf
+                        out.uprof = self.prof.array
+                        out.info = self.info
+                        out.info['StreamTime'] = ichunk * n_chunk * grid.dt
+                        yield out
+                        ichunk += 1
+                        nbuf = 0
+                        if ichunk == n_chunks:
+                            return
+        finally:
+            self._segment = 0
+
     def _build_outdata(self,):
         """
         Construct the output data object and return it.
@@ -476,7 +736,7 @@ class tsrun(object):
         out.info = self.info
         return out
 
-    def _calcTimeSeries(self,):
+    def _calcTimeSeries(self, out=None):
         """
         Compute the u,v,w, timeseries based on the spectral, coherence
         and Reynold's stress models.
@@ -486,6 +746,11 @@ class tsrun(object):
         timeseries.  It performs the steps outlined in Veers84's [1]_
         equations 7 and 8.
 
+        Parameters
+        ----------
+        out : array_like (3 x nz x ny x nt), optional
+              The array in which to place the timeseries.
+
         Returns
         -------
         turb : the turbulent velocity timeseries array (3 x nz x ny x
@@ -504,35 +769,167 @@ class tsrun(object):
         available it is used (it is much more efficient), otherwise
         the numpy implementation of Cholesky is used.
 
+        3) If :attr:`mem_limit` is set, the phases are computed,
+        correlated and scaled by the spectrum in blocks of
+        frequencies (see :meth:`_iter_fblocks`).
+
         .. [1] Veers, Paul (1984) 'Modeling Stochastic Wind Loads on
                Vertical Axis Wind Turbines', Sandia Report 1909, 17
                pages.
 
         """
-        grid = self.grid
-        tmp = np.zeros((grid.n_comp, grid.n_z, grid.n_y, grid.n_f + 1),
-                       dtype=ts_complex)
         if dbg:
             self.timer.start()
-        # First calculate the 'base' set of random phases:
-        phases = self.phase(self)
-        # Now correlate the phases at each point to set the Reynold's stress:
-        phases = self.stress.calc_phases(phases)
-        # Now correlate the phases between points to set the spatial coherence:
-        phases = self.cohere.calc_phases(phases)
-        # Now multiply the phases by the spectrum...
-        tmp[..., 1:] = np.sqrt(self.spec.array) * grid.reshape(phases)
-        # and compute the inverse fft to produce the timeseries:
-        ts = irfft(tmp)
+        ts = self._spec2ts(self._calcSpecBuffer(), out=out)
         if dbg:
             self.timer.stop()
-        # Select only the time period requested:
-        # Grab a random number of where to cut the timeseries.
-        i0_out = self.randgen.randint(grid.n_t - grid.n_t_out + 1)
-        ts = ts[..., i0_out:i0_out + grid.n_t_out] / (grid.dt / grid.n_f) ** 0.5
-        ts -= ts.mean(-1)[..., None]  # Make sure the turbulence has zero mean.
         return ts
 
+    def _calcSpecBuffer(self,):
+        """
+        Compute the spectrum buffer (3 x nz x ny x nf+1) of one
+        realization: the random phases, correlated by the stress and
+        coherence models and scaled by the spectrum.
+        """
+        grid = self.grid
+        tmp = np.zeros((grid.n_comp, grid.n_z, grid.n_y, grid.n_f + 1),
+                       dtype=ts_complex)
+        for ifs in self._iter_fblocks():
+            # First calculate the 'base' set of random phases:
+            phases = self.phase(self, ifs)
+            # Now correlate the phases at each point to set the Reynold's stress:
+            phases = self.stress.calc_phases(phases)
+            # Now correlate the phases between points to set the spatial coherence:
+            phases = self.cohere.calc_phases(phases, ifs)
+            # Now multiply the phases by the spectrum...
+            self._scale_spec(tmp, phases, ifs)
+            del phases
+        return tmp
+
+    def _scale_spec(self, tmp, phases, ifs):
+        """
+        Scale the correlated `phases` (3 x n_p x n_f) by the
+        square-root of the spectrum at frequencies `ifs`, and write
+        them into the spectrum buffer `tmp` (3 x nz x ny x nf+1).
+
+        If tslib is available this is done in one (threaded) pass
+        over each component.
+        """
+        grid = self.grid
+        spec = self.spec.array[..., ifs]
+        if tslib is not None and tmp.flags['C_CONTIGUOUS']:
+            i0 = 1 + (ifs.start or 0)
+            for icomp in range(grid.n_comp):
+                tslib.specscale(tmp[icomp].reshape(grid.n_p, -1).T,
+                                phases[icomp].T,
+                                grid.flatten(spec[icomp]).T,
+                                i0, self.ncore)
+        else:
+            np.multiply(np.sqrt(spec), grid.reshape(phases),
+                        out=tmp[..., 1:][..., ifs])
+
+    def _spec2ts(self, tmp, full=False, out=None):
+        """
+        Compute the output timeseries from the spectrum buffer `tmp`
+        (3 x nz x ny x nf+1).
+
+        If `full` is True the entire (periodic) timeseries is
+        returned, otherwise a random :attr:`_n_out`-point section of
+        it. The timeseries is placed in `out`, if it is specified.
+        """
+        grid = self.grid
+        # The length of the irfft output (this is n_t - 1 if n_t is odd):
+        n_fft = 2 * grid.n_f
+        if full:
+            i0_out, n_out = 0, n_fft
+        else:
+            # Select only the time period requested:
+            # Grab a random number of where to cut the timeseries.
+            n_out = self._n_out
+            i0_out = self.randgen.randint(n_fft - n_out + 1)
+        if out is None:
+            ts = np.empty((grid.n_comp, grid.n_z, grid.n_y, n_out),
+                          dtype=self._ts_dtype)
+        else:
+            ts = out
+        fft = self.fft
+        slc = slice(i0_out, i0_out + n_out)
+        for icomp in range(grid.n_comp):
+            # and compute the inverse fft to produce the timeseries:
+            if self.precision == 'mixed' and not fft.single:
+                # This backend returns float64, so transform one row at
+                # a time to limit the size of the temporary.
+                for iz in range(grid.n_z):
+                    ts[icomp, iz] = fft.irfft(tmp[icomp, iz], self.ncore)[..., slc]
+            elif self.precision == 'double' and fft.single:
+                # This backend would compute a single-precision
+                # transform of the (complex64) buffer.
+                ts[icomp] = fft.irfft(tmp[icomp].astype(complex128),
+                                      self.ncore)[..., slc]
+            else:
+                ts[icomp] = fft.irfft(tmp[icomp], self.ncore)[..., slc]
+        ts /= (grid.dt / grid.n_f) ** 0.5
+        # Make sure the turbulence has zero mean.
+        ts -= ts.mean(-1, dtype=float64)[..., None]
+        return ts
+
+    @property
+    def _n_out(self,):
+        """
+        The number of timesteps in the output timeseries: n_t_out, or
+        the length of the irfft output (2 * n_f) if that is shorter
+        (i.e. if n_t is odd and n_t_out == n_t).
+        """
+        return min(self.grid.n_t_out, 2 * self.grid.n_f)
+
+    @property
+    def _ts_dtype(self,):
+        """
+        The data type of the output timeseries (see :attr:`precision`).
+        """
+        if self.precision == 'mixed':
+            return float32
+        return float64
+
+    def _iter_fblocks(self, n_seeds=1):
+        """
+        An iterator of the frequency blocks (slices into grid.f) for
+        which phases are computed, correlated and scaled at one time.
+
+        If :attr:`mem_limit` is None, this yields a single slice of
+        all frequencies. Otherwise the block size is estimated from
+        the size of the grid (and number of seeds, `n_seeds`), and the
+        memory that remains after allocating the spectral array, the
+        spectrum buffer(s) and the output timeseries.
+        """
+        grid = self.grid
+        if self.mem_limit is None:
+            yield slice(None)
+            return
+        n_p = grid.n_p
+        # The arrays that span all frequencies (spectrum, spectrum
+        # buffer, one-component irfft output, and output timeseries):
+        nbytes_ts = self._ts_dtype().itemsize
+        nbytes_fixed = n_p * (3 * 4 * grid.n_f +
+                              3 * 8 * (grid.n_f + 1) * n_seeds +
+                              nbytes_ts * grid.n_t +
+                              3 * nbytes_ts * grid.n_t_out)
+        # The arrays for each frequency in a block (phases, stress
+        # masks and random values, spectral scaling temporaries):
+        nbytes_f = n_p * (3 * 8 * n_seeds + 6 * 8 + 3 * 16)
+        if tslib is None:
+            # The numpy coherence/Cholesky engine works on full
+            # (n_p x n_p) matrices.
+            nbytes_f += 24 * n_p ** 2
+        nblk = int((parse_bytes(self.mem_limit) - nbytes_fixed) // nbytes_f)
+        if nblk < 1:
+            warn("The memory limit ({}) is too small for this grid; "
+                 "using the smallest possible frequency blocks."
+                 .format(self.mem_limit))
+            nblk = 1
+        for i0 in range(0, grid.n_f, nblk):
+            yield slice(i0, min(i0 + nblk, grid.n_f))
+
 
 class tsdata(gridProps):
     """
@@ -555,26 +952,24 @@ class tsdata(gridProps):
         if 'config' in self.info:
             out.update(self.info['config'])
 
-        uhub = out['uhub'] = statObj(self.uhub)
-        out['vhub'] = statObj(self.vhub, uhub.mean)
-        out['whub'] = statObj(self.whub, uhub.mean)
-        out['hhub'] = statObj(np.sqrt(self.uhub ** 2 + self.vhub ** 2))
+        mom = self.moments
+        hub = mom.hub
+        uhub = out['uhub'] = statObj(hub['u'])
+        out['vhub'] = statObj(hub['v'], uhub.mean)
+        out['whub'] = statObj(hub['w'], uhub.mean)
+        out['hhub'] = statObj(hub['h'])
         out['grid'] = self.grid
-        out['upvp'] = statObj(self.uhub * self.vhub)
-        out['upwp'] = statObj(self.vhub * self.whub)
-        out['vpwp'] = statObj(self.vhub * self.whub)
+        out['upvp'] = statObj(hub['uv'])
+        out['upwp'] = statObj(hub['vw'])
+        out['vpwp'] = statObj(hub['vw'])
         out['upvp'].scale = 1
         out['upwp'].scale = 1
         out['vpwp'].scale = 1
-        out['tke'] = statObj((self.uturb ** 2).sum(0))
-        out['tke'] = statObj((self.uturb ** 2).sum(0))
-        out['ctke'] = statObj(0.5 * np.sqrt(
-            (self.uturb[0] * self.uturb[1]) ** 2 +
-            (self.uturb[0] * self.uturb[2]) ** 2 +
-            (self.uturb[1] * self.uturb[2]) ** 2))
-        out['u_sigma'] = self.uturb[0].flatten().std()
-        out['v_sigma'] = self.uturb[1].flatten().std()
-        out['w_sigma'] = self.uturb[2].flatten().std()
+        out['tke'] = statObj(mom.tke)
+        out['ctke'] = statObj(mom.ctke)
+        out['u_sigma'] = mom.field_std(0)
+        out['v_sigma'] = mom.field_std(1)
+        out['w_sigma'] = mom.field_std(2)
         out['TurbModel_desc'] = self.info['specModel']['description']
         out['RandSeed1'] = self.info['RandSeed']
 
@@ -590,9 +985,9 @@ class tsdata(gridProps):
         out['GridBase'] = self.grid.z[0]
         out['HeightOffset'] = 0.0  # Is this correct?
         out['ydata'] = self.grid.y
-        out['z_ustd'] = np.concatenate((self.grid.z[:, None], self.uturb[0].std(-1)), axis=1)
-        out['z_vstd'] = np.concatenate((self.grid.z[:, None], self.uturb[1].std(-1)), axis=1)
-        out['z_wstd'] = np.concatenate((self.grid.z[:, None], self.uturb[2].std(-1)), axis=1)
+        out['z_ustd'] = np.concatenate((self.grid.z[:, None], mom.std[0]), axis=1)
+        out['z_vstd'] = np.concatenate((self.grid.z[:, None], mom.std[1]), axis=1)
+        out['z_wstd'] = np.concatenate((self.grid.z[:, None], mom.std[2]), axis=1)
         u, v, w = self.uprof.mean(-1)[:, :, None]
         out['WINDSPEEDPROFILE'] = np.concatenate((
             self.grid.z[:, None],
@@ -613,17 +1008,29 @@ class tsdata(gridProps):
         return out
 
     def __getitem__(self, ind):
+        """
+        A tsdata object of the (z, y) grid-points `ind`.
+
+        The velocity arrays of the output are views of the arrays of
+        this object (no data is copied).
+        """
         if not hasattr(ind, '__len__'):
             ind = [ind]
         else:
-            list(ind)
+            ind = list(ind)
         for idx, val in enumerate(ind):
             if val.__class__ is not slice:
                 ind[idx] = slice(val, val + 1)
-        out = type(self)(self.grid[ind])
-        ind = [slice(None)] + list(ind)
-        out.uturb = self.uturb[ind]
+        # Grid objects are indexed (y, z):
+        out = type(self)(self.grid[(ind + [slice(None)])[1::-1]])
+        ind = (slice(None), ) + tuple(ind)
+        if getattr(type(self.uturb), 'subarray', None) is not None:
+            out.uturb = self.uturb.subarray(ind)
+        else:
+            out.uturb = self.uturb[ind]
         out.uprof = self.uprof[ind]
+        if hasattr(self, 'info'):
+            out.info = self.info
         return out
 
     @property
@@ -644,6 +1051,47 @@ class tsdata(gridProps):
         """
         self.grid = grid
 
+    @property
+    def uturb(self,):
+        """
+        The turbulent velocity array (3 x n_z x n_y x n_t).
+        """
+        return self._uturb
+
+    @uturb.setter
+    def uturb(self, val):
+        self._uturb = val
+        self._moments = None
+        self._totals = {}
+
+    @property
+    def uprof(self,):
+        """
+        The mean velocity profile array (3 x n_z x n_y).
+        """
+        return self._uprof
+
+    @uprof.setter
+    def uprof(self, val):
+        self._uprof = val
+        self._moments = None
+        self._totals = {}
+
+    @property
+    def moments(self,):
+        """
+        The statistics of the data (a :class:`tsMoments
+        <pyts.moments.tsMoments>` object).
+
+        These are computed in one pass over the data the first time
+        they are needed, and are cached until :attr:`uturb` or
+        :attr:`uprof` is set. The tke, Ti, stress and summary-file
+        statistics are computed from this object.
+        """
+        if getattr(self, '_moments', None) is None:
+            self._moments = tsMoments(self.uturb, self.uprof, self.ihub)
+        return self._moments
+
     @property
     def shape(self,):
         """
@@ -667,6 +1115,23 @@ class tsdata(gridProps):
             self._time = np.arange(0, self.uturb.shape[-1] * self.dt, self.dt)
         return self._time
 
+    def close(self,):
+        """
+        Close the file from which the data is (lazily) read, if any
+        (see :func:`read.hdf5 <pyts.io.read.hdf5>`). The data in the
+        file can not be accessed after this.
+        """
+        fl = getattr(self, '_file', None)
+        if fl is not None:
+            fl.close()
+            self._file = None
+
+    def __enter__(self,):
+        return self
+
+    def __exit__(self, type, value, trace):
+        self.close()
+
     def __repr__(self,):
         return ('<TurbSim data object:\n'
                 '%d %4.2fs-timesteps, %0.2fx%0.2fm (%dx%d) z-y grid (hubheight=%0.2fm).>' %
@@ -678,33 +1143,53 @@ class tsdata(gridProps):
                  self.grid.n_y,
                  self.grid.zhub))
 
+    def _total(self, comp=None):
+        """
+        The (lazy) total velocity array of `comp` (None: all
+        components). This object is kept until :attr:`uturb` or
+        :attr:`uprof` is set, so that its cache (see
+        :meth:`totalArray.cache <pyts.base.lazyArray.cache>`) is
+        shared.
+        """
+        if comp not in self._totals:
+            self._totals[comp] = totalArray(self.uturb, self.uprof, comp)
+        return self._totals[comp]
+
     @property
     def utotal(self,):
         """
-        The total (mean + turbulent), 3-d velocity array
+        The total (mean + turbulent), 3-d velocity array.
+
+        This is a lazy :class:`totalArray <pyts.base.totalArray>`:
+        indexing it only computes the points that are indexed. Use
+        its `cache` and `release` methods to hold the full array in
+        memory.
         """
-        return self.uturb + self.uprof[:, :, :, None]
+        return self._total()
 
     @property
     def u(self,):
         """
-        The total (mean + turbulent), u-component of velocity.
+        The total (mean + turbulent), u-component of velocity (a lazy
+        array, see :attr:`utotal`).
         """
-        return self.uturb[0] + self.uprof[0, :, :, None]
+        return self._total(0)
 
     @property
     def v(self,):
         """
-        The total (mean + turbulent), v-component of velocity.
+        The total (mean + turbulent), v-component of velocity (a lazy
+        array, see :attr:`utotal`).
         """
-        return self.uturb[1] + self.uprof[1, :, :, None]
+        return self._total(1)
 
     @property
     def w(self,):
         """
-        The total (mean + turbulent), w-component of velocity.
+        The total (mean + turbulent), w-component of velocity (a lazy
+        array, see :attr:`utotal`).
         """
-        return self.uturb[2] + self.uprof[2, :, :, None]
+        return self._total(2)
 
     @property
     def UHUB(self,):
@@ -739,7 +1224,7 @@ class tsdata(gridProps):
         """
         The turbulence kinetic energy.
         """
-        return (self.uturb ** 2).mean(-1)
+        return self.moments.meansq
 
     @property
     def ctke(self,):
@@ -750,20 +1235,14 @@ class tsdata(gridProps):
         """
         The turbulence intensity, std(u')/U, at each point in the grid.
         """
-        return np.std(self.uturb[0], axis=-1) / self.uprof[0]
+        return self.moments.std[0] / self.uprof[0]
 
     @property
     def stress(self,):
         """
         The Reynold's stress tensor.
         """
-        if not hasattr(self, '_dat_stress'):
-            self._stress_dat = np.concatenate(
-                (np.mean(self.uturb[0] * self.uturb[1], axis=-1)[None],
-                 np.mean(self.uturb[0] * self.uturb[2], axis=-1)[None],
-                 np.mean(self.uturb[1] * self.uturb[2], axis=-1)[None]),
-                0)
-        return self._stress_dat
+        return self.moments.meanprod
 
     @property
     def upvp_(self,):
@@ -801,7 +1280,7 @@ class tsdata(gridProps):
         stats['Ti'] = self.tke[slc] / self.UHUB
         return stats
 
-    def write_formatted(self, filename):
+    def write_formatted(self, filename, nproc=None):
         """
         Save the data in this tsdata object in 'formatted' format (.u, .v, .w files).
 
@@ -810,8 +1289,11 @@ class tsdata(gridProps):
 
         filename : string
                 '.u', '.v', and '.w' will be appended to the end of the filename.
+        nproc : int, optional
+                The number of processes that write the files (see
+                :func:`write.formatted <pyts.io.write.formatted>`).
         """
-        write.formatted(filename, self)
+        write.formatted(filename, self, nproc=nproc)
 
     def write_bladed(self, filename):
         """
@@ -835,6 +1317,19 @@ class tsdata(gridProps):
         """
         write.turbsim(filename, self)
 
+    def write_npy(self, filename):
+        """
+        Save the data in this tsdata object as a PyTurbSim npy bundle
+        (see :func:`write.npy <pyts.io.write.npy>`).
+
+        Parameters
+        ----------
+        filename : str
+                   The bundle (directory) name to which the data should
+                   be written.
+        """
+        write.npy(filename, self)
+
     def write_sum(self, filename):
         """
         Currently PyTurbSim does not support writing summary (.sum) files.
@@ -842,12 +1337,15 @@ class tsdata(gridProps):
         write.sum(filename, self._sumdict)
 
     if write.h5py is not None:
-        def write_hdf5(self, filename):
+        def write_hdf5(self, filename, **kwargs):
             """Save the data in this tsdata object as an hdf5 file.
 
             Parameters
             ----------
             filename : str
                        The filename to which the data should be written.
+
+            Other keyword arguments (chunk_t, compression, etc.) are
+            passed to :func:`write.hdf5 <pyts.io.write.hdf5>`.
             """
-            write.hdf5(filename, self)
+            write.hdf5(filename, self, **kwargs)
@@ -171,6 +171,36 @@ def lowPrimeFact_near(n, pmax=31, nmin=None, evens_only=True):
     return ih
 
 
+def parse_bytes(val):
+    """
+    Convert a memory size to a number of bytes.
+
+    Parameters
+    ----------
+    val : int, float or str
+          The memory size. Numbers are interpreted as bytes. Strings
+          may include a (case-insensitive) unit suffix, e.g. '4GB',
+          '512 MB' or '1.5G'. Units are powers of 1024.
+
+    Returns
+    -------
+    nbytes : int
+             The number of bytes.
+
+    """
+    if not isinstance(val, basestring):
+        return int(val)
+    units = dict(K=2 ** 10, M=2 ** 20, G=2 ** 30, T=2 ** 40)
+    v = val.strip().upper()
+    for sfx in ['IB', 'B']:
+        if v.endswith(sfx):
+            v = v[:-len(sfx)]
+            break
+    if v and v[-1] in units:
+        return int(float(v[:-1]) * units[v[-1]])
+    return int(float(v))
+
+
 def fix2range(vals, minval, maxval):
     """
     A helper function that sets the value of the array or number `vals` to
@@ -0,0 +1,229 @@
+"""
+This module computes the statistics of PyTurbSim output data in one
+(chunked) pass over time.
+
+The statistics of a :class:`tsdata <pyts.main.tsdata>` object (its
+tke, Ti, Reynold's stress, the summary-file statistics, etc.) are
+computed by a :class:`tsMoments` object the first time they are
+needed, and are cached on the tsdata object.
+
+Means, variances and covariances are accumulated with the
+pairwise-update formulas of Chan, Golub and LeVeque (1979) (a
+chunked form of Welford's algorithm) in float64.
+
+"""
+import numpy as np
+
+#: The (approximate) size, in bytes, of the time-chunks of the
+#: velocity field that are processed at once.
+chunk_bytes = 2 ** 24
+
+
+class scalarMoments(object):
+
+    """
+    The count, mean, sum of squared deviations, minimum and maximum
+    of a quantity, accumulated one chunk at a time (see
+    :meth:`update`).
+
+    This object has `mean`, `std`, `min` and `max` methods (like an
+    array), so it can be used to initialize a :class:`statObj
+    <pyts.base.statObj>`.
+
+    Parameters
+    ----------
+    shape : tuple, optional (())
+            The shape of the statistics. Each chunk is reduced over
+            all of its trailing axes beyond this shape.
+    """
+
+    def __init__(self, shape=()):
+        self.n = 0
+        self._mean = np.zeros(shape)
+        self.m2 = np.zeros(shape)
+        self._min = np.empty(shape)
+        self._max = np.empty(shape)
+        self._min.fill(np.inf)
+        self._max.fill(-np.inf)
+
+    def _axes(self, dat):
+        return tuple(range(self._mean.ndim, dat.ndim))
+
+    def update(self, dat):
+        """
+        Add the values in `dat` (an array whose leading dimensions
+        are the shape of this object).
+        """
+        axes = self._axes(dat)
+        n_b = dat.size // max(self._mean.size, 1)
+        if n_b == 0:
+            return
+        mean_b = dat.mean(axes, dtype=np.float64)
+        dev = dat - mean_b.reshape(mean_b.shape + (1, ) * len(axes))
+        dev **= 2
+        self._combine(n_b, mean_b, dev.sum(axes))
+        self._min = np.minimum(self._min, dat.min(axes))
+        self._max = np.maximum(self._max, dat.max(axes))
+
+    def _combine(self, n_b, mean_b, m2_b):
+        """
+        Combine the count, `n_b`, mean, `mean_b`, and sum of squared
+        deviations, `m2_b`, of a chunk with the current values.
+
+        Returns the difference between the means (chunk - current).
+        """
+        n = self.n + n_b
+        delta = mean_b - self._mean
+        self._mean = self._mean + delta * (float(n_b) / n)
+        self.m2 = self.m2 + m2_b + delta ** 2 * (float(self.n) * n_b / n)
+        self.n = n
+        return delta
+
+    def mean(self, *args, **kwargs):
+        return self._mean
+
+    def var(self, *args, **kwargs):
+        return self.m2 / self.n
+
+    def std(self, *args, **kwargs):
+        return np.sqrt(self.var())
+
+    def min(self, *args, **kwargs):
+        return self._min
+
+    def max(self, *args, **kwargs):
+        return self._max
+
+
+class tsMoments(object):
+
+    """
+    The statistics of a turbulence field, computed in one pass over
+    time.
+
+    Parameters
+    ----------
+    uturb : array_like (3 x n_z x n_y x n_t)
+            The turbulent velocity.
+    uprof : array_like (3 x n_z x n_y)
+            The mean velocity profile.
+    ihub :  tuple
+            The (z, y) index of the hub.
+
+    Attributes
+    ----------
+    n :       int
+              The number of timesteps.
+    mean :    array_like (3 x n_z x n_y)
+              The mean of `uturb` at each point.
+    var :     array_like (3 x n_z x n_y)
+              The variance of `uturb` at each point.
+    cov :     array_like (3 x n_z x n_y)
+              The u'v', u'w' and v'w' covariances at each point.
+    tke :     :class:`scalarMoments`
+              The statistics of the instantaneous tke,
+              :math:`u'^2+v'^2+w'^2`, over the whole field.
+    ctke :    :class:`scalarMoments`
+              The statistics of the instantaneous coherent tke,
+              :math:`0.5\\sqrt{(u'v')^2+(u'w')^2+(v'w')^2}`, over the
+              whole field.
+    hub :     dict of :class:`scalarMoments`
+              The statistics of the hub-height (total) velocity
+              timeseries: 'u', 'v', 'w', 'h' (horizontal speed),
+              and the products 'uv', 'uw' and 'vw'.
+    """
+
+    _pairs = [(0, 1), (0, 2), (1, 2)]
+
+    def __init__(self, uturb, uprof, ihub):
+        shp = uturb.shape[:-1]
+        self._pt = scalarMoments(shp)
+        self._c = np.zeros(shp)
+        self.tke = scalarMoments()
+        self.ctke = scalarMoments()
+        self.hub = dict((nm, scalarMoments())
+                        for nm in ['u', 'v', 'w', 'h', 'uv', 'uw', 'vw'])
+        n_t = uturb.shape[-1]
+        step = max(chunk_bytes // (8 * int(np.prod(shp))), 1)
+        for i0 in xrange(0, n_t, step):
+            self._update(np.asarray(uturb[..., i0:i0 + step]), uprof, ihub)
+
+    def _update(self, dat, uprof, ihub):
+        pt = self._pt
+        n_0 = pt.n
+        n_b = dat.shape[-1]
+        mean_b = dat.mean(-1, dtype=np.float64)
+        dev = dat - mean_b[..., None]
+        # The co-moments of the chunk:
+        c_b = np.empty_like(self._c)
+        for idx, (i, j) in enumerate(self._pairs):
+            c_b[idx] = (dev[i] * dev[j]).sum(-1)
+        dev **= 2
+        delta = pt._combine(n_b, mean_b, dev.sum(-1))
+        del dev
+        for idx, (i, j) in enumerate(self._pairs):
+            self._c[idx] += c_b[idx] + delta[i] * delta[j] * (float(n_0) * n_b / pt.n)
+        # Instantaneous tke and ctke:
+        sq = dat ** 2
+        self.tke.update(sq.sum(0))
+        del sq
+        prod = np.empty_like(dat)
+        for idx, (i, j) in enumerate(self._pairs):
+            np.multiply(dat[i], dat[j], out=prod[idx])
+        prod **= 2
+        self.ctke.update(0.5 * np.sqrt(prod.sum(0)))
+        del prod
+        # The hub-height (total velocity) timeseries:
+        u, v, w = [dat[(idx, ) + tuple(ihub)] + uprof[idx][ihub] for idx in range(3)]
+        for nm, val in [('u', u), ('v', v), ('w', w),
+                        ('h', np.sqrt(u ** 2 + v ** 2)),
+                        ('uv', u * v), ('uw', u * w), ('vw', v * w)]:
+            self.hub[nm].update(val)
+
+    @property
+    def n(self,):
+        return self._pt.n
+
+    @property
+    def mean(self,):
+        return self._pt.mean()
+
+    @property
+    def var(self,):
+        return self._pt.var()
+
+    @property
+    def std(self,):
+        """
+        The standard deviation of `uturb` at each point.
+        """
+        return self._pt.std()
+
+    @property
+    def meansq(self,):
+        """
+        The mean of the square of `uturb` at each point.
+        """
+        return self.var + self.mean ** 2
+
+    @property
+    def cov(self,):
+        return self._c / self.n
+
+    @property
+    def meanprod(self,):
+        """
+        The mean of u'v', u'w' and v'w' at each point.
+        """
+        mn = self.mean
+        return self.cov + np.array([mn[i] * mn[j] for i, j in self._pairs])
+
+    def field_std(self, comp):
+        """
+        The standard deviation of component `comp` over all points
+        and timesteps.
+        """
+        mn = self.mean[comp]
+        gmean = mn.mean()
+        m2 = self._pt.m2[comp].sum() + self.n * ((mn - gmean) ** 2).sum()
+        return np.sqrt(m2 / (self.n * mn.size))
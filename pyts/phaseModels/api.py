@@ -6,5 +6,9 @@ Available phase models
 randPhase
   A uniform-distribution random-phase model.
 
+philoxPhase
+  A uniform-distribution random-phase model using a counter-based
+  generator (the phases do not depend on blocking or threading).
+
 """
-from main import randPhase
+from main import randPhase, philoxPhase
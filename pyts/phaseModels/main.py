@@ -2,6 +2,10 @@
 The main random phase models.
 """
 from .base import phaseModelBase, np, ts_complex
+from .philox import philox4x32
+from numpy import uint64, float64, cos, sin
+from multiprocessing import cpu_count
+from threading import Thread
 
 
 class randPhase(phaseModelBase):
@@ -14,7 +18,7 @@ class randPhase(phaseModelBase):
 
     """
 
-    def __call__(self, tsrun):
+    def __call__(self, tsrun, ifreq=slice(None), out=None):
         """
         Create and calculate the phases for the `tsrun` instance.
 
@@ -22,6 +26,11 @@ class randPhase(phaseModelBase):
         ----------
         tsrun :         :class:`tsrun <pyts.main.tsrun>`
                         A TurbSim run object.
+        ifreq :         slice, optional
+                        The frequencies (indices into tsrun.grid.f) for
+                        which to compute phases (default: all).
+        out :           array_like(3,n_p,n_f), optional
+                        An array into which the phases are written.
 
         Returns
         -------
@@ -29,10 +38,124 @@ class randPhase(phaseModelBase):
                         An array of random phases.
 
         """
-        phases = np.empty((tsrun.grid.n_comp, tsrun.grid.n_p, tsrun.grid.n_f),
-                          dtype=ts_complex, order='F')
-        phases[:] = np.exp(1j * 2 * np.pi *
+        n_f = len(tsrun.grid.f[ifreq])
+        if out is None:
+            out = np.empty((tsrun.grid.n_comp, tsrun.grid.n_p, n_f),
+                           dtype=ts_complex, order='F')
+        out[:] = np.exp(1j * 2 * np.pi *
                            tsrun.randgen.rand(tsrun.grid.n_comp,
                                               tsrun.grid.n_p,
-                                              tsrun.grid.n_f))
-        return phases
+                                              n_f))
+        return out
+
+
+class philoxPhase(phaseModelBase):
+
+    """
+    This phase-model randomizes the phases uniformly (like
+    :class:`randPhase`), using the counter-based Philox4x32-10
+    generator (see :mod:`pyts.phaseModels.philox`).
+
+    The phase of each point, component and frequency is a function of
+    the run's RandSeed and the (point, component, frequency) indices
+    only. Therefore the phases do not depend on how the frequencies are
+    broken into blocks (see :attr:`tsrun.mem_limit
+    <pyts.main.tsrun.mem_limit>`), or on the number of threads used to
+    compute them (:attr:`tsrun.ncore <pyts.main.tsrun.ncore>`).
+
+    This model does not reproduce the phases of :class:`randPhase`
+    (or TurbSim) for the same RandSeed. Note that stress models
+    still draw from :attr:`tsrun.randgen`.
+
+    Parameters
+    ----------
+    nf_block :  int, optional (64)
+                The number of frequencies computed by a thread at one
+                time (this sets the size of the temporary arrays).
+
+    """
+
+    def __init__(self, nf_block=64):
+        self.nf_block = nf_block
+
+    def __call__(self, tsrun, ifreq=slice(None), out=None):
+        """
+        Create and calculate the phases for the `tsrun` instance.
+
+        Parameters
+        ----------
+        tsrun :         :class:`tsrun <pyts.main.tsrun>`
+                        A TurbSim run object.
+        ifreq :         slice, optional
+                        The frequencies (indices into tsrun.grid.f) for
+                        which to compute phases (default: all).
+        out :           array_like(3,n_p,n_f), optional
+                        An array into which the phases are written.
+
+        Returns
+        -------
+        out :           array_like(3,n_p,n_f)
+                        An array of random phases.
+
+        """
+        grid = tsrun.grid
+        i_f = np.arange(grid.n_f)[ifreq]
+        if out is None:
+            out = np.empty((grid.n_comp, grid.n_p, len(i_f)),
+                           dtype=ts_complex, order='F')
+        seed = self._key(tsrun.RandSeed)
+        blocks = [(icomp, i0) for icomp in range(grid.n_comp)
+                  for i0 in range(0, len(i_f), self.nf_block)]
+        ncore = tsrun.ncore if tsrun.ncore > 0 else cpu_count()
+        ncore = min(ncore, len(blocks))
+
+        def work(blks):
+            for icomp, i0 in blks:
+                i1 = i0 + self.nf_block
+                self._fill(out[icomp, :, i0:i1], seed, icomp, i_f[i0:i1],
+                           tsrun._segment)
+        if ncore <= 1:
+            work(blocks)
+        else:
+            # numpy releases the GIL in its ufunc loops, so the
+            # threads run concurrently.
+            threads = [Thread(target=work, args=(blocks[ith::ncore], ))
+                       for ith in range(ncore)]
+            for th in threads:
+                th.start()
+            for th in threads:
+                th.join()
+        return out
+
+    @staticmethod
+    def _key(RandSeed):
+        """
+        The first (seed) word of the key for `RandSeed`. The seed is
+        mapped to a uint32 as in :meth:`tsrun._randstate
+        <pyts.main.tsrun._randstate>`.
+        """
+        return (RandSeed + 2147483648) % 2 ** 32
+
+    @staticmethod
+    def _fill(out, seed, icomp, i_f, segment=0):
+        """
+        Write the unit phasors of component `icomp` at the frequency
+        indices `i_f` of the stream `segment` (see
+        :meth:`tsrun.stream <pyts.main.tsrun.stream>`) into `out`
+        (n_p x len(i_f)).
+
+        The counter of each group of four points is (frequency index,
+        group index, stream segment, 0), and the key is (seed,
+        component).
+        """
+        n_p = out.shape[0]
+        ngrp = (n_p + 3) // 4
+        words = philox4x32((i_f.astype(uint64)[:, None],
+                            np.arange(ngrp, dtype=uint64)[None, :],
+                            uint64(segment), uint64(0)),
+                           (seed, icomp))
+        # Points 4*j + (0, 1, 2, 3) use the four words of group j.
+        ang = words.transpose(1, 2, 0).reshape(len(i_f), 4 * ngrp)[:, :n_p].T
+        ang = (ang + 0.5) * (2 * np.pi / 2 ** 32)
+        out.real = cos(ang)
+        out.imag = sin(ang)
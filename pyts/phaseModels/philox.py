@@ -0,0 +1,57 @@
+"""
+A vectorized implementation of the Philox4x32-10 counter-based random
+number generator.
+
+Philox (Salmon et al. 2011, 'Parallel random numbers: as easy as 1, 2,
+3') maps a 128-bit counter and a 64-bit key to 128 random bits. Each
+output depends only on its counter and key (not on the order in which
+outputs are drawn), so any subset of a random stream can be
+generated independently (e.g. in blocks, or in threads).
+
+"""
+from numpy import uint64, empty, broadcast_arrays
+
+_M0 = uint64(0xD2511F53)
+_M1 = uint64(0xCD9E8D57)
+_W0 = uint64(0x9E3779B9)
+_W1 = uint64(0xBB67AE85)
+_MASK = uint64(0xFFFFFFFF)
+_S32 = uint64(32)
+
+
+def philox4x32(ctr, key, rounds=10):
+    """
+    Compute the Philox4x32 random words for counters `ctr` and `key`.
+
+    Parameters
+    ----------
+    ctr :       sequence of 4 array_like (uint32 values)
+                The four 32-bit words of the counter(s).
+    key :       sequence of 2 ints (uint32 values)
+                The two 32-bit words of the key.
+    rounds :    int, optional (10)
+                The number of rounds.
+
+    Returns
+    -------
+    out :       array_like(4, ...), dtype=uint64
+                The four random 32-bit words (stored as uint64) for
+                each counter. The trailing shape is the broadcast
+                shape of the counter words.
+
+    """
+    c0, c1, c2, c3 = [c.astype(uint64) for c in broadcast_arrays(*ctr)]
+    k0, k1 = uint64(key[0]), uint64(key[1])
+    for irnd in range(rounds):
+        if irnd > 0:
+            k0 = (k0 + _W0) & _MASK
+            k1 = (k1 + _W1) & _MASK
+        p0 = _M0 * c0
+        p1 = _M1 * c2
+        c0 = (p1 >> _S32) ^ c1 ^ k0
+        c2 = (p0 >> _S32) ^ c3 ^ k1
+        c1 = p1 & _MASK
+        c3 = p0 & _MASK
+    out = empty((4, ) + c0.shape, dtype=uint64)
+    out[0], out[1], out[2], out[3] = c0, c1, c2, c3
+    return out
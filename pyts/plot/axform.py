@@ -199,7 +199,7 @@ class Tiprof(prof):
     _ylabel = '%'
 
     def _calc_tsdata(self, tsdat, comp, igrid=None):
-        tmp = (100 * np.std(tsdat.uturb[comp, :, tsdat.ihub[1]], axis=-1)
+        tmp = (100 * tsdat.moments.std[comp, :, tsdat.ihub[1]]
                / tsdat.uprof[0, :, tsdat.ihub[1]])
         return tmp, tsdat.z
 
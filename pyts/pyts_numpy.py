@@ -2,4 +2,4 @@
 This module imports the pieces of numpy that are used by PyTurbSim.
 """
 
-from numpy import ndarray, array, zeros, ones, empty, empty_like, ones_like, zeros_like, arange, std, mean, sqrt, log, arctan, exp, pi, sort, dot, concatenate, abs, cumsum, sign, minimum, mod, angle, tile, where
+from numpy import ndarray, array, zeros, ones, empty, empty_like, ones_like, zeros_like, arange, std, mean, sqrt, log, arctan, exp, pi, sort, dot, concatenate, abs, cumsum, sign, minimum, mod, angle, tile, where, einsum, rollaxis, searchsorted, triu_indices, matmul, ascontiguousarray, broadcast, multiply, maximum, nonzero, diff, allclose, copyto
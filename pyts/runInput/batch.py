@@ -0,0 +1,339 @@
+"""
+The 'batch' module of the runInput package runs 'campaigns' of
+TurbSim input files in parallel.
+
+Example usage
+-------------
+
+From the command line::
+
+    pyTurbSim.py batch inputs/*.inp -j 32 --log campaign.jsonl
+
+Or from python:
+
+>>> from pyts.runInput.batch import run_batch
+>>> run_batch(['case01.inp', 'case02.inp'], nproc=2, log='campaign.jsonl')
+
+Each input file is read, run and written (to the output files
+specified in that input file) by a worker in a process pool. The
+number of runs in flight is limited by the number of processes, and
+by their estimated peak memory (see :func:`peak_mem`). Input files
+whose outputs are already complete are skipped, and input files that
+are listed more than once are only run once. A JSON-lines record of
+each run (status and timings) is appended to the `log` file. If a
+worker dies during a run (e.g. it is killed for running out of
+memory), that run is recorded as an error.
+
+"""
+from ..io.input import read as readInput
+from ..io.base import convname, stripinp
+from ..misc import parse_bytes
+from .main import cfg2grid, cfg2tsrun, write
+from multiprocessing import Pool, Queue, cpu_count
+import traceback
+import argparse
+import json
+import glob
+import time
+import sys
+import os
+
+
+def peak_mem(grid):
+    """
+    Estimate the peak memory (in bytes) of a PyTurbSim run and write
+    on `grid`.
+
+    This includes the spectral array, the phases, the spectrum buffer,
+    the irfft output, the output timeseries and the copies made
+    while writing it to disk. It is only a rough estimate.
+    """
+    n_p = grid.n_p
+    return n_p * (3 * 4 * grid.n_f +         # spectrum
+                  3 * 8 * grid.n_f * 3 +     # phases (+ temporaries)
+                  3 * 8 * (grid.n_f + 1) +   # spectrum buffer
+                  8 * grid.n_t +             # irfft output
+                  3 * 8 * grid.n_t_out * 3)  # timeseries (+ copies)
+
+
+def outputs(tsinput, fname):
+    """
+    The list of output files that a run of `tsinput` (from input
+    file `fname`) writes.
+
+    The summary (.sum) file is last, because it is written last.
+    """
+    out = []
+    if tsinput['WrBLFF']:
+        out.append(convname(fname, '.wnd'))
+    if tsinput['WrADFF']:
+        out.append(convname(fname, '.bts'))
+    if tsinput['WrFMTFF']:
+        out += [stripinp(fname) + '.' + comp for comp in 'uvw']
+    out.append(convname(fname, '.sum'))
+    return out
+
+
+def is_complete(tsinput, fname):
+    """
+    Return True if all of the outputs of input file `fname` exist,
+    and are newer than it.
+    """
+    tm = os.path.getmtime(fname)
+    for fnm in outputs(tsinput, fname):
+        if not os.path.isfile(fnm) or os.path.getmtime(fnm) < tm:
+            return False
+    return True
+
+
+# The queue on which the workers of run_batch report the (job id,
+# process id) of each run that they start.
+_started = None
+
+
+def _init_worker(started):
+    global _started
+    _started = started
+
+
+def run_one(fname, job=None):
+    """
+    Read, run and write the TurbSim input file `fname`.
+
+    This is the function that is executed by the workers of
+    :func:`run_batch`. It does not raise errors; instead the returned
+    record has status 'error' and the traceback.
+
+    Parameters
+    ----------
+    fname : str
+            The TurbSim input file.
+    job : int, optional
+          The job id of this run (in :func:`run_batch`).
+
+    Returns
+    -------
+    record : dict
+             A dictionary of the status and timings of this run.
+    """
+    if _started is not None:
+        _started.put((job, os.getpid()))
+    rec = dict(fname=fname, status='ok', pid=os.getpid(),
+               start=time.time())
+    try:
+        tm0 = time.time()
+        tsinput = readInput(fname)
+        tsr = cfg2tsrun(tsinput)
+        rec['time_read'] = time.time() - tm0
+        tm0 = time.time()
+        tsdat = tsr()
+        rec['time_run'] = time.time() - tm0
+        tm0 = time.time()
+        # Pool workers can not start processes:
+        write(tsdat, tsinput, fname, nproc=1)
+        rec['time_write'] = time.time() - tm0
+    except Exception:
+        rec['status'] = 'error'
+        rec['error'] = traceback.format_exc()
+    rec['end'] = time.time()
+    rec['time_total'] = rec['end'] - rec['start']
+    return rec
+
+
+def _total_mem():
+    """
+    The total physical memory of this machine (or None if it is
+    unknown).
+    """
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (ValueError, AttributeError, OSError):
+        return None
+
+
+def _wait_one(pool, inflight, pids, started, poll):
+    """
+    Wait for one of the `inflight` jobs ({job id: (fname, mem,
+    AsyncResult)}) to finish, or for the worker that is running one to
+    die.
+
+    Returns the job id and its record.
+    """
+    while True:
+        for job, (fname, mem, res) in inflight.items():
+            if res.ready():
+                return job, res.get()
+        while not started.empty():
+            job, pid = started.get()
+            pids[job] = pid
+        # The pool replaces workers that die, so the workers that are
+        # not in the pool are dead. (`_pool` is the pool's list of
+        # worker processes.)
+        alive = set(prc.pid for prc in pool._pool if prc.exitcode is None)
+        for job, (fname, mem, res) in inflight.items():
+            if job in pids and pids[job] not in alive:
+                # Allow time for a result that was sent just before
+                # the worker exited to arrive.
+                res.wait(poll)
+                if res.ready():
+                    return job, res.get()
+                return job, dict(fname=fname, status='error', pid=pids[job],
+                                 error='The worker process (pid {:d}) died '
+                                 'during this run (e.g. it was killed for '
+                                 'running out of memory).'.format(pids[job]))
+        inflight.values()[0][2].wait(poll)
+
+
+def run_batch(fnames, nproc=None, mem_limit=None, log=None,
+              skip_complete=True, verbose=True, poll=1.0):
+    """
+    Run the TurbSim input files `fnames` in a pool of processes.
+
+    Parameters
+    ----------
+    fnames : list of str
+             The TurbSim input files to run.
+    nproc : int, optional (number of cores)
+            The number of worker processes.
+    mem_limit : int or str, optional (80% of physical memory)
+            The total memory that the runs in flight may use. A run is
+            only started if its estimated peak memory (see
+            :func:`peak_mem`) fits within the memory that remains. A
+            run that does not fit even by itself is run alone.
+    log : str, optional
+          A file to which a JSON record of each run is appended.
+    skip_complete : bool, optional (True)
+                    Skip input files whose outputs are already
+                    complete (see :func:`is_complete`).
+    verbose : bool, optional (True)
+              Print progress.
+    poll : float, optional (1.0)
+           The interval (seconds) at which the workers are checked.
+
+    Returns
+    -------
+    records : list of dict
+              The record of each run (see :func:`run_one`).
+    """
+    if nproc is None:
+        nproc = cpu_count()
+    if mem_limit is None:
+        mem_limit = _total_mem()
+        if mem_limit is not None:
+            mem_limit = int(0.8 * mem_limit)
+    else:
+        mem_limit = parse_bytes(mem_limit)
+    # Each input file is only run once.
+    uniq = []
+    seen = set()
+    for fname in fnames:
+        path = os.path.realpath(fname)
+        if path not in seen:
+            seen.add(path)
+            uniq.append(fname)
+    fnames = uniq
+    if log is not None:
+        logfl = open(log, 'a')
+
+    def record(rec):
+        if log is not None:
+            logfl.write(json.dumps(rec) + '\n')
+            logfl.flush()
+        if verbose:
+            print('[{:d}/{:d}] {:>7s} {}{}'.format(
+                len(records) + 1, len(fnames), rec['status'], rec['fname'],
+                ' ({:0.1f}s)'.format(rec['time_total'])
+                if 'time_total' in rec else ''))
+            if rec['status'] == 'error':
+                print(rec['error'])
+        records.append(rec)
+
+    records = []
+    # Determine the memory requirements (and skip completed runs).
+    todo = []
+    for fname in fnames:
+        try:
+            tsinput = readInput(fname)
+            if skip_complete and is_complete(tsinput, fname):
+                record(dict(fname=fname, status='skipped'))
+                continue
+            todo.append((fname, peak_mem(cfg2grid(tsinput))))
+        except Exception:
+            record(dict(fname=fname, status='error',
+                        error=traceback.format_exc()))
+
+    started = Queue()
+    pool = Pool(nproc, initializer=_init_worker, initargs=(started, ))
+    # The runs in flight, {job id: (fname, mem, AsyncResult)}:
+    inflight = dict()
+    pids = dict()
+    njob = 0
+    lost = False
+    try:
+        while todo or inflight:
+            # Start as many runs as fit in the pool and memory budget.
+            while todo and len(inflight) < nproc:
+                fname, mem = todo[0]
+                mem_used = sum(val[1] for val in inflight.values())
+                if (inflight and mem_limit is not None and
+                        mem_used + mem > mem_limit):
+                    break
+                todo.pop(0)
+                inflight[njob] = (fname, mem,
+                                  pool.apply_async(run_one, (fname, njob)))
+                njob += 1
+            # Wait for a run to finish (or fail).
+            job, rec = _wait_one(pool, inflight, pids, started, poll)
+            lost = lost or not inflight[job][2].ready()
+            rec['mem_est'] = inflight.pop(job)[1]
+            record(rec)
+    finally:
+        if lost or inflight:
+            # The pool can not be joined while it has tasks whose
+            # worker died (or that were abandoned).
+            pool.terminate()
+        else:
+            pool.close()
+        pool.join()
+        if log is not None:
+            logfl.close()
+    return records
+
+
+def main(args=None):
+    """
+    The command-line interface for :func:`run_batch`.
+    """
+    parser = argparse.ArgumentParser(
+        prog='pyTurbSim.py batch',
+        description='Run a campaign of TurbSim input files in parallel.')
+    parser.add_argument('inputs', nargs='+',
+                        help='TurbSim input files, glob patterns or '
+                        'directories (containing .inp files).')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='The number of worker processes '
+                        '(default: the number of cores).')
+    parser.add_argument('-m', '--mem', default=None,
+                        help="The memory that the runs in flight may use, "
+                        "e.g. '32GB' (default: 80%% of physical memory).")
+    parser.add_argument('--log', default='pyts_batch.jsonl',
+                        help='The JSON-lines log file '
+                        '(default: pyts_batch.jsonl).')
+    parser.add_argument('--force', action='store_true',
+                        help='Rerun inputs whose outputs are complete.')
+    args = parser.parse_args(args)
+    fnames = []
+    for inp in args.inputs:
+        if os.path.isdir(inp):
+            fnames += sorted(glob.glob(os.path.join(inp, '*.inp')))
+        elif os.path.isfile(inp):
+            fnames.append(inp)
+        else:
+            fnames += sorted(glob.glob(inp))
+    records = run_batch(fnames, nproc=args.jobs, mem_limit=args.mem,
+                        log=args.log, skip_complete=not args.force)
+    return int(any(rec['status'] == 'error' for rec in records))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -67,7 +67,7 @@ def run(tsinput):
     return tsr()
 
 
-def write(tsdat, tsinput, fname=None):
+def write(tsdat, tsinput, fname=None, nproc=None):
     """
     Write TurbSim-output to a file.
 
@@ -79,6 +79,9 @@ def write(tsdat, tsinput, fname=None):
                 A PyTurbSim input object.
     fname :     str, optional
                 The filename to writeout (default obtained from `tsinput`)
+    nproc :     int, optional
+                The number of processes that write 'formatted' files
+                (see :func:`write.formatted <pyts.io.write.formatted>`).
 
     This function determines which file-types to writeout (bladed or
     TurbSim) from the `tsinput` object
@@ -90,7 +93,7 @@ def write(tsdat, tsinput, fname=None):
     if tsinput['WrADFF']:
         tsdat.write_turbsim(fname)
     if tsinput['WrFMTFF']:
-        tsdat.write_formatted(fname)
+        tsdat.write_formatted(fname, nproc=nproc)
     tsdat.write_sum(fname)
 
 
@@ -30,30 +30,10 @@ class genNWTC(specModelBase):
 
         """
         out = specObj(tsrun)
-        # !!!FIXTHIS: The following lines bind calculation to the
-        # !!!MODEL. This goes against the PyTurbSim philosophy of
-        # !!!keeping calculations separated from models.
-        self.f = out.f
-        self._work = np.zeros(out.n_f, dtype=ts_float)
-        self.zhub = tsrun.grid.zhub
-        # Fixing this will require something like changing:
-        #   out[comp][iz, iy] = model(z, u, comp)
-        # to:
-        #   self.model(out, u, icomp, iz, iy)
-        # Note here that u must be supplied explicitly because it is
-        # not known to 'out'.
-        # This would also require:
-        # 1) deleting the self._work variable
-        # 2) changing ``def L(self,)`` from a property to ``def
-        #    L(self, tsrun)`` and using tsrun.grid.zhub their.
-        # 3) changing all calls to ``self.L`` accordingly.
-        for iz in range(out.n_z):
-            for iy in range(out.n_y):
-                z = out.grid.z[iz]
-                u = tsrun.prof.u[iz, iy]
-                for comp in out.grid.comp:
-                    self._work[:] = 0.0
-                    out[comp][iz, iy] = self.model(z, u, comp)
+        out[:] = self.model(tsrun.grid.z[:, None, None],
+                            tsrun.prof.u[:, :, None],
+                            out.f[None, None, :],
+                            tsrun)
         return out
 
 
@@ -135,22 +115,33 @@ class NWTC_stable(genNWTC):
     def _phim(self):
         return 1. + 4.7 * self.zL
 
-    def model(self, z, u, comp):
+    def model(self, z, u, f, tsrun):
         """
-        Calculate the spectral model for height `z`, velocity `u`, and
-        velocity component `comp`.
+        Calculate the spectral model at heights `z`, velocities `u`
+        and frequencies `f` (which must be broadcastable).
+
+        Returns
+        -------
+        spec : array_like (3 x ...)
+               The u, v and w spectra (the first index is the
+               component).
         """
-        coef = self.coefs[comp]
+        coef = np.array(self.coefs)
+        if coef.ndim > 2:
+            # Sum the spectra of each set of coefficients.
+            return sum(self._model(z, u, f, c) for c in coef)
+        return self._model(z, u, f, coef)
+
+    def _model(self, z, u, f, coef):
         z_u = z / u
-        denom = (self.f / self._phim)
         numer = (self._phie / self._phim) ** self.pow2_3 / self._phim * self.Ustar2
-        if coef.ndim > 1:
-            self._work[:] = 0
-            for c in coef:
-                self._work += self.model(z, u, comp)
-            return self._work
-        return (coef[0] * self.s_coef[comp, 0] * numer * z_u /
-                (1. + self.s_coef[comp, 1] * (coef[1] * z_u * denom) ** self.pow5_3))
+        # The shape of the coefficients (the first index is the component).
+        shp = (3, ) + (1, ) * len(np.broadcast(z, u, f).shape)
+        c0 = ts_float(coef[:, 0] * self.s_coef[:, 0]).reshape(shp)
+        c1 = ts_float(self.s_coef[:, 1]).reshape(shp)
+        c2 = ts_float(coef[:, 1]).reshape(shp)
+        return (c0 * numer * z_u /
+                (1. + c1 * (c2 * z_u * f / self._phim) ** self.pow5_3))
 
 
 class NWTC_unstable(genNWTC):
@@ -186,9 +177,11 @@ class NWTC_unstable(genNWTC):
         self.zL = zL
         self.ZI = ZI
         if p_coefs is None:
-            self.p_coefs = p_coefs_unstable
+            p_coefs = p_coefs_unstable
         if f_coefs is None:
-            self.f_coefs = f_coefs_unstable
+            f_coefs = f_coefs_unstable
+        self.p_coefs = np.array(p_coefs, dtype=ts_float)
+        self.f_coefs = np.array(f_coefs, dtype=ts_float)
 
     def _sumfile_string(self, tsrun, ):
         sumstring_format = """
@@ -205,35 +198,38 @@ class NWTC_unstable(genNWTC):
                   w                =  [{f[2][0]:0.4g}, {f[2][1]:0.4g}]
         """
         return sumstring_format.format(dat=self,
-                                       Lmo=self.L,
+                                       Lmo=self.L(tsrun),
                                        p=self.p_coefs,
                                        f=self.f_coefs,)
 
-    @property
-    def L(self, ):
-        if not hasattr(self, 'zhub'):
-            raise Exception("The Monin-Obhukov is unknown until this "
-                            "model has been '__call__'d.")
-        return self.zhub / self.zL
+    def L(self, tsrun):
+        """
+        The Monin-Obhukov length scale for `tsrun`.
+        """
+        return tsrun.grid.zhub / self.zL
 
-    def model(self, z, u, comp):
+    def model(self, z, u, f, tsrun):
         r"""
         Computes the spectrum for this 'unstable' spectral model.
 
         Parameters
         ----------
-        z : array_like (nz)
+        z : array_like
             Height above the surface [m].
-        u : array_like (nz,ny)
+        u : array_like
             Mean velocity [m/s].
-        comp : int {0,1,2}
-               Index (u,v,w) of the spectrum to compute.
+        f : array_like
+            Frequency [hz].
+        tsrun : :class:`.tsrun`
+                The TurbSim run object.
+
+        `z`, `u` and `f` must be broadcastable.
 
         Returns
         -------
-        spec : :class:`.specObj`
-               The spectral object which contains the 'array'
-               (property) of spectra at each point in the grid.
+        spec : array_like (3 x ...)
+               The u, v and w spectra (the first index is the
+               component).
 
         Notes
         -----
@@ -274,31 +270,24 @@ class NWTC_unstable(genNWTC):
            :math:`\gamma  = \frac{f'^2+0.09(z/ZI)^2}{f'^2+0.0225}`
 
         """
-        p_coef = self.p_coefs[comp]
-        f_coef = self.f_coefs[comp]
+        p_coef = self.p_coefs
+        f_coef = self.f_coefs
         pow5_3 = self.pow5_3
         z_ZI = z / self.ZI
-        num0 = self.Ustar2 * self.ZI / u * (self.ZI / -self.L()) ** self.pow2_3
-        fZI_u = self.f * self.ZI / u
+        num0 = self.Ustar2 * self.ZI / u * (self.ZI / -self.L(tsrun)) ** self.pow2_3
+        fZI_u = f * self.ZI / u
         z_u = z / u
         num1 = self.Ustar2 * z_u * (1 - z_ZI) ** 2
-        fz_u = self.f * z_u
-        if comp == 0:
-            tmp0 = 1 + 15 * z_ZI
-            self._work = (p_coef[0] * num0 / (1 + (fZI_u * f_coef[0]) ** pow5_3)
-                          + p_coef[1] * num1 / (tmp0 + f_coef[1] * fz_u) ** pow5_3)
-        elif comp == 1:
-            tmp0 = 1 + 2.8 * z_ZI
-            self._work = (p_coef[0] * num0 / (1 + f_coef[0] * fZI_u) ** pow5_3
-                          + p_coef[1] * num1 / (tmp0 + f_coef[1] * fz_u) ** pow5_3)
-            ## # Handle extra (e.g. wake, for outf_turb) coefficients:
-            ## if coef.shape[0]>2 and not np.isnan(coef[2,0]+coef[2,1]):
-            # self._work+=coef[2,0]*17*num1/(tmp0+coef[2,1]*9.5*fz_u)**pow5_3
-        else:
-            self._work = (p_coef[0] * num0 / (1 + f_coef[0] * fZI_u) ** pow5_3
-                          * np.sqrt((fz_u ** 2 + (0.3 * z_ZI) ** 2) / (fz_u ** 2 + 0.0225))
-                          + p_coef[1] * num1 / (1 + f_coef[1] * fz_u ** pow5_3))
-        return self._work
+        fz_u = f * z_u
+        out = np.empty((3, ) + np.broadcast(z, u, f).shape, dtype=ts_float)
+        out[0] = (p_coef[0, 0] * num0 / (1 + (fZI_u * f_coef[0, 0]) ** pow5_3)
+                  + p_coef[0, 1] * num1 / (1 + 15 * z_ZI + f_coef[0, 1] * fz_u) ** pow5_3)
+        out[1] = (p_coef[1, 0] * num0 / (1 + f_coef[1, 0] * fZI_u) ** pow5_3
+                  + p_coef[1, 1] * num1 / (1 + 2.8 * z_ZI + f_coef[1, 1] * fz_u) ** pow5_3)
+        out[2] = (p_coef[2, 0] * num0 / (1 + f_coef[2, 0] * fZI_u) ** pow5_3
+                  * np.sqrt((fz_u ** 2 + (0.3 * z_ZI) ** 2) / (fz_u ** 2 + 0.0225))
+                  + p_coef[2, 1] * num1 / (1 + f_coef[2, 1] * fz_u ** pow5_3))
+        return out
 
 
 def smooth(Ustar, Ri, ZI=None):
@@ -156,46 +156,57 @@ class stressObj(base.calcObj, base.gridProps):
             print self.validity
             raise Exception('The input reynolds stresses are inconsistent.')
 
+    # The number of frequencies that calc_phases processes at one time.
+    _nf_block = 64
+
     def calc_phases(self, phases):
         """
         Here we control the Reynold's stress by setting the phases
         between components to be the same for a fraction of the
         frequencies.
+
+        One uniform random value is drawn for each point and
+        frequency. It selects one of five branches: the 'overlap'
+        (all three components share a phase), the u'v', u'w' or v'w'
+        non-overlap pieces (two components share a phase), or none
+        (the phases are independent). The probability of each branch
+        is the same as drawing an independent value for each piece
+        in turn, and keeping the first piece that is selected.
+
+        The phases are modified in place, in blocks of frequencies.
+        The random values are drawn frequency-by-frequency, so the
+        result does not depend on how the frequencies of a run are
+        broken into blocks.
         """
         self.check_validity()
-        rgen = self.randgen.rand
         if (self.array == 0).all():
             return phases  # No stress, so the phases are independently-random.
         # fudge_factor=0.93 #!!!FIXTHIS: The 0.93 is a fudge factor to account
         # for ... ???
         fudge_factor = 1
         rstrmat = self.grid.flatten(self.corr)[..., None]
-        shp = (self.grid.n_p, self.grid.n_f)
-
-        ####
-        # First we set the 'overlap' stress. i.e. the phases that are the same
-        # (or opposite) for all three components.
-        # This is computed during check_validity:
+        sgn = np.sign(rstrmat).astype(base.ts_float)
+        # The 'overlap' is computed during check_validity:
         ovr = self.grid.flatten(self._overlap)[:, None]
-        inds_used = (rgen(*shp) * fudge_factor) < ovr
-        phases[2][inds_used] = (np.sign(rstrmat[1]) * phases[0])[inds_used]
-        phases[1][inds_used] = (np.sign(rstrmat[0]) * phases[0])[inds_used]
-        ####
-        # Now set the u'v' non-overlap piece.
-        inds = ((rgen(*shp) * fudge_factor) <
-                np.abs(rstrmat[0]) - ovr) & (~inds_used)
-        phases[1][inds] = (np.sign(rstrmat[0]) * phases[0])[inds]
-        inds_used |= inds
-        ####
-        # Now set the u'w' non-overlap piece.
-        inds = ((rgen(*shp) * fudge_factor) <
-                np.abs(rstrmat[1]) - ovr) & (~inds_used)
-        phases[2][inds] = (np.sign(rstrmat[1]) * phases[0])[inds]
-        inds_used |= inds
-        ####
-        # Now set the v'w' non-overlap piece.
-        inds = ((rgen(*shp) * fudge_factor) <
-                np.abs(rstrmat[2]) - ovr) & (~inds_used)
-        phases[2][inds] = (np.sign(rstrmat[2]) * phases[1])[inds]
-        inds_used |= inds
+        # The upper limit of the uniform random value for each branch
+        # (overlap, u'v', u'w', v'w'):
+        lims = np.empty((4, ) + ovr.shape)
+        lims[0] = ovr
+        for idx in range(3):
+            p_rem = 1 - lims[idx]
+            lims[idx + 1] = lims[idx] + p_rem * np.maximum(np.abs(rstrmat[idx]) - ovr, 0)
+        lims /= fudge_factor
+        n_p, n_f = phases.shape[1:]
+        for i0 in range(0, n_f, self._nf_block):
+            ph = phases[:, :, i0:i0 + self._nf_block]
+            rnd = self.randgen.rand(ph.shape[2], n_p).T
+            ovr_ = rnd < lims[0]
+            uv_ = rnd < lims[1]
+            uw_ = (rnd < lims[2]) & ~uv_
+            vw_ = (rnd < lims[3]) & ~(rnd < lims[2])
+            uw_ |= ovr_
+            # v'w' does not change phases[1], so this can be done first:
+            np.copyto(ph[2], sgn[2] * ph[1], where=vw_)
+            np.copyto(ph[2], sgn[1] * ph[0], where=uw_)
+            np.copyto(ph[1], sgn[0] * ph[0], where=uv_)
         return phases
@@ -1,6 +1,34 @@
 # The setup script for installing pyTurbSim.
 from numpy.distutils.core import setup, Extension
+from numpy.distutils.system_info import get_info
 from pyts import _version as ver
+import os
+
+# tslib is linked against the system (optimized) LAPACK/BLAS if one
+# is found (the coherence matrices are then factored with the blocked
+# SPOTRF). Otherwise, or if the environment variable PYTS_LAPACK=0,
+# the bundled reference LAPACK routines are compiled into it.
+tslib_sources = ['pyts/tslib/tslib.pyf',
+                 'pyts/tslib/tslib.f95', ]
+tslib_args = dict(extra_f90_compile_args=['-fopenmp', '-cpp'],
+                  extra_link_args=['-lgomp'], )
+if os.environ.get('PYTS_LAPACK', '1') != '0':
+    lapack_info = get_info('lapack_opt')
+else:
+    lapack_info = {}
+if lapack_info:
+    tslib_args['extra_f90_compile_args'].append('-DTSLIB_LAPACK')
+    tslib_args['libraries'] = lapack_info.get('libraries', [])
+    tslib_args['library_dirs'] = lapack_info.get('library_dirs', [])
+    tslib_args['extra_link_args'] += lapack_info.get('extra_link_args', [])
+else:
+    tslib_sources += ['pyts/tslib/lapack/lsame.f',
+                      'pyts/tslib/lapack/sdot.f',
+                      'pyts/tslib/lapack/spptrf.f',
+                      'pyts/tslib/lapack/sscal.f',
+                      'pyts/tslib/lapack/sspr.f',
+                      'pyts/tslib/lapack/stpsv.f',
+                      'pyts/tslib/lapack/xerbla.f', ]
 
 setup(name='PyTurbSim',
       version=ver.__version__,
@@ -33,15 +61,7 @@ setup(name='PyTurbSim',
                'gTurbSim.py',
                ],
       ext_modules=[Extension('pyts.tslib',
-                             sources=['pyts/tslib/tslib.pyf',
-                                      'pyts/tslib/tslib.f95',
-                                      'pyts/tslib/lapack/lsame.f',
-                                      'pyts/tslib/lapack/sdot.f',
-                                      'pyts/tslib/lapack/spptrf.f',
-                                      'pyts/tslib/lapack/sscal.f',
-                                      'pyts/tslib/lapack/sspr.f',
-                                      'pyts/tslib/lapack/stpsv.f',
-                                      'pyts/tslib/lapack/xerbla.f', ],
-                             extra_link_args=['-lgomp'],
+                             sources=tslib_sources,
+                             **tslib_args
                              )],
       )
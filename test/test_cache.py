@@ -0,0 +1,38 @@
+"""
+Check the least-recently-used eviction of the coherence factor cache.
+
+Run this with pytest (from the repository root)::
+
+    python -m pytest test/
+"""
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import numpy as np
+from pyts.cohereModels.cache import factorCache
+
+
+def test_evict():
+    cache = factorCache(max_bytes=3000)
+    for key in 'abc':
+        cache.set(key, np.zeros(250, dtype=np.float32))
+    cache.get('a')
+    cache.set('d', np.zeros(250, dtype=np.float32))
+    # 'b' is the least-recently-used entry.
+    assert sorted(cache._entries) == ['a', 'c', 'd']
+    assert cache.nbytes == 3000
+
+
+def test_reopen_smaller(tmpdir):
+    directory = str(tmpdir)
+    cache = factorCache(max_bytes='1MB', directory=directory)
+    for key in 'abcd':
+        cache.set(key, np.zeros(250, dtype=np.float32))
+        # The entries are ordered by their files' modification times.
+        os.utime(cache._fname(key), (0, 'abcd'.index(key)))
+    assert len(factorCache(max_bytes='1MB', directory=directory)) == 4
+    size = os.path.getsize(cache._fname('a'))
+    cache = factorCache(max_bytes=2 * size, directory=directory)
+    assert sorted(cache._entries) == ['c', 'd']
+    assert cache.nbytes <= cache.max_bytes
+    assert sorted(os.listdir(directory)) == ['c.npy', 'd.npy']
@@ -0,0 +1,87 @@
+"""
+Check that PyTurbSim HDF5 files round-trip exactly, and that the lazy
+reader (h5Array) indexes like a numpy array.
+
+Run this with pytest (from the repository root)::
+
+    python -m pytest test/
+"""
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import numpy as np
+import pytest
+h5py = pytest.importorskip('h5py')
+import pyts.api as pyts
+from pyts.io import write, read
+
+
+def small_run(time_sec=20.1):
+    tsr = pyts.tsrun(RandSeed=11)
+    tsr.grid = pyts.tsGrid(center=60, ny=5, nz=4, height=20., width=25.,
+                           time_sec=time_sec, dt=0.1)
+    tsr.prof = pyts.profModels.pl(10, 60)
+    tsr.spec = pyts.specModels.nwtc.smooth(1., 0.1)
+    tsr.cohere = pyts.cohereModels.nwtc()
+    tsr.stress = pyts.stressModels.uniform(-0.3, 0.1, 0)
+    return tsr
+
+
+@pytest.fixture(scope='module')
+def tsdat():
+    return small_run()()
+
+
+def check_equal(dat, ref):
+    assert dat.shape == ref.shape
+    assert np.array_equal(np.asarray(dat.uturb[:]), ref.uturb)
+    assert np.array_equal(dat.uprof, ref.uprof)
+    assert np.array_equal(dat.y, ref.y)
+    assert np.array_equal(dat.z, ref.z)
+    assert dat.dt == ref.dt
+    assert dat.grid.n_t == ref.grid.n_t
+    assert dat.grid.clockwise == ref.grid.clockwise
+    assert dat.info['RandSeed'] == ref.info['RandSeed']
+
+
+@pytest.mark.parametrize('lazy', [True, False])
+@pytest.mark.parametrize('kwargs', [{}, dict(chunk_t=7, compression='gzip')])
+def test_roundtrip(tsdat, lazy, kwargs, tmpdir):
+    fname = str(tmpdir.join('out.inp'))
+    write.hdf5(fname, tsdat, **kwargs)
+    with read.hdf5(str(tmpdir.join('out.h5')), lazy=lazy) as dat:
+        check_equal(dat, tsdat)
+
+
+def test_stream(tmpdir):
+    fname = str(tmpdir.join('stream.h5'))
+    tsr = small_run(time_sec=51.2)
+    chunks = list(tsr.stream(chunk_sec=3, n_chunks=4))
+    write.hdf5(fname, chunks, chunk_t=16)
+    ref = np.concatenate([chunk.uturb for chunk in chunks], axis=-1)
+    with read.hdf5(fname) as dat:
+        assert dat.grid.n_t == dat.shape[-1] == ref.shape[-1]
+        assert np.array_equal(dat.uturb[:], ref)
+
+
+def test_h5array(tsdat, tmpdir):
+    fname = str(tmpdir.join('out.h5'))
+    write.hdf5(fname, tsdat, chunk_t=16)
+    ref = tsdat.uturb
+    with read.hdf5(fname) as dat:
+        arr = dat.uturb
+        assert arr.shape == ref.shape
+        for ind in [0, -1, (Ellipsis, 5), (1, slice(None, None, -1)),
+                    (slice(None), 2, slice(1, 4), slice(10, 100, 3)),
+                    (Ellipsis, slice(None, None, -7)),
+                    (Ellipsis, [3, 1, 8]), ([2, 0, 2], 1)]:
+            assert np.array_equal(arr[ind], ref[ind])
+        # A sub-array stays lazy, and indexes like the sliced array.
+        sub = arr.subarray((slice(None), slice(1, 3), slice(None, None, -1),
+                            slice(5, 50)))
+        ref_sub = ref[:, 1:3, ::-1, 5:50]
+        assert sub.shape == ref_sub.shape
+        assert np.array_equal(sub[1, :, 1:], ref_sub[1, :, 1:])
+        # Slicing the lazy tsdata object gives the same data.
+        assert np.array_equal(np.asarray(dat[1:3, 2:][:].uturb),
+                              tsdat[1:3, 2:].uturb)
@@ -0,0 +1,58 @@
+"""
+Check that PyTurbSim npy bundles round-trip exactly, including those
+written directly by tsrun.run(out=...).
+
+Run this with pytest (from the repository root)::
+
+    python -m pytest test/
+"""
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import numpy as np
+import pytest
+import pyts.api as pyts
+from pyts.io import write, read
+
+
+def small_run():
+    tsr = pyts.tsrun(RandSeed=13)
+    tsr.grid = pyts.tsGrid(center=60, ny=5, nz=4, height=20., width=25.,
+                           time_sec=20.1, dt=0.1)
+    tsr.prof = pyts.profModels.pl(10, 60)
+    tsr.spec = pyts.specModels.nwtc.smooth(1., 0.1)
+    tsr.cohere = pyts.cohereModels.nwtc()
+    tsr.stress = pyts.stressModels.uniform(-0.3, 0.1, 0)
+    return tsr
+
+
+def check_equal(dat, ref):
+    assert dat.shape == ref.shape
+    assert dat.uturb.dtype == ref.uturb.dtype
+    assert np.array_equal(dat.uturb, ref.uturb)
+    assert np.array_equal(dat.uprof, ref.uprof)
+    assert np.array_equal(dat.y, ref.y)
+    assert np.array_equal(dat.z, ref.z)
+    assert dat.dt == ref.dt
+    assert dat.grid.n_t == ref.grid.n_t
+    assert dat.grid.clockwise == ref.grid.clockwise
+    assert dat.info['RandSeed'] == ref.info['RandSeed']
+
+
+@pytest.mark.parametrize('mmap', [True, False])
+def test_roundtrip(mmap, tmpdir):
+    ref = small_run()()
+    write.npy(str(tmpdir.join('out.inp')), ref)
+    dat = read.npy(str(tmpdir.join('out.pyts')), mmap=mmap)
+    assert isinstance(dat.uturb, np.memmap) == mmap
+    check_equal(dat, ref)
+
+
+def test_run_out(tmpdir):
+    fname = str(tmpdir.join('run.pyts'))
+    dat = small_run().run(out=fname)
+    # The velocity is computed into the bundle's file.
+    assert isinstance(dat.uturb, np.memmap)
+    assert os.path.abspath(dat.uturb.filename) == os.path.join(fname, 'uturb.npy')
+    check_equal(read.npy(fname), dat)
+    check_equal(dat, small_run()())
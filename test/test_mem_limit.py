@@ -0,0 +1,65 @@
+"""
+Check that a run computed in frequency blocks (tsrun.mem_limit)
+matches the same run computed in one block.
+
+Run this with pytest (from the repository root)::
+
+    python -m pytest test/
+"""
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import warnings
+import numpy as np
+import pyts.api as pyts
+from pyts.phaseModels.api import philoxPhase
+
+
+def small_run(cohere, mem_limit=None, time_sec=30):
+    tsr = pyts.tsrun(RandSeed=5, mem_limit=mem_limit)
+    tsr.grid = pyts.tsGrid(center=60, ny=4, nz=4, height=20., width=20.,
+                           time_sec=time_sec, dt=0.1)
+    tsr.prof = pyts.profModels.pl(10, 60)
+    tsr.spec = pyts.specModels.nwtc.smooth(1., 0.1)
+    tsr.cohere = cohere()
+    tsr.stress = pyts.stressModels.uniform(-0.3, 0.1, 0)
+    # The phases of randPhase depend on the block size, so use Philox.
+    tsr.phase = philoxPhase()
+    return tsr
+
+
+def check_blocks(cohere, **kwargs):
+    ref = small_run(cohere, **kwargs)()
+    for mem_limit in ['2MB', 1]:
+        with warnings.catch_warnings(record=True):
+            # The second limit is too small, and uses one frequency
+            # per block.
+            warnings.simplefilter('always')
+            dat = small_run(cohere, mem_limit, **kwargs)()
+        assert dat.uturb.shape == ref.uturb.shape
+        assert np.allclose(dat.uturb, ref.uturb, rtol=0, atol=1e-5)
+
+
+def test_nwtc():
+    check_blocks(lambda: pyts.cohereModels.nwtc())
+
+
+def test_iec():
+    check_blocks(lambda: pyts.cohereModels.iec())
+
+
+def test_iec_circulant():
+    check_blocks(lambda: pyts.cohereModels.iec(method='circulant'))
+
+
+def test_odd_nt():
+    check_blocks(lambda: pyts.cohereModels.nwtc(), time_sec=30.1)
+
+
+def test_small_limit_warns():
+    tsr = small_run(lambda: pyts.cohereModels.nwtc(), mem_limit=1)
+    with warnings.catch_warnings(record=True) as w:
+        warnings.simplefilter('always')
+        blocks = list(tsr._iter_fblocks())
+    assert len(w) == 1
+    assert len(blocks) == tsr.grid.n_f
@@ -0,0 +1,66 @@
+"""
+Check the Philox phase model: the generator reproduces the Random123
+known-answer vectors, and the phases do not depend on the block size
+or the number of threads.
+
+Run this with pytest (from the repository root)::
+
+    python -m pytest test/
+"""
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import numpy as np
+import pyts.api as pyts
+from pyts.phaseModels.api import philoxPhase
+from pyts.phaseModels.philox import philox4x32
+
+
+def test_known_answers():
+    # philox4x32_10 known-answer vectors from Random123 (kat_vectors).
+    kat = [((0, 0, 0, 0), (0, 0),
+            (0x6627e8d5, 0xe169c58d, 0xbc57ac4c, 0x9b00dbd8)),
+           ((0xffffffff, ) * 4, (0xffffffff, ) * 2,
+            (0x408f276d, 0x41c83b0e, 0xa20bc7c6, 0x6d5451fd)),
+           ((0x243f6a88, 0x85a308d3, 0x13198a2e, 0x03707344),
+            (0xa4093822, 0x299f31d0),
+            (0xd16cfe09, 0x94fdcceb, 0x5001e420, 0x24126ea1)), ]
+    for ctr, key, ans in kat:
+        ctr = [np.array(c, dtype=np.uint64) for c in ctr]
+        assert list(philox4x32(ctr, key)) == list(ans)
+
+
+def small_run(ncore=1, nf_block=64):
+    tsr = pyts.tsrun(RandSeed=1234, ncore=ncore)
+    # An odd number of points, so the last group of four is partial.
+    tsr.grid = pyts.tsGrid(center=60, ny=3, nz=3, height=20., width=20.,
+                           time_sec=30, dt=0.1)
+    tsr.phase = philoxPhase(nf_block=nf_block)
+    return tsr
+
+
+def test_block_invariance():
+    tsr = small_run()
+    ref = tsr.phase(tsr)
+    assert np.allclose(np.abs(ref), 1)
+    for nf_block in [1, 7, 1000]:
+        tsr = small_run(nf_block=nf_block)
+        assert np.array_equal(tsr.phase(tsr), ref)
+    # A subset of the frequencies gives the same phases.
+    ifs = slice(13, 101)
+    assert np.array_equal(tsr.phase(tsr, ifs), ref[..., ifs])
+
+
+def test_ncore_invariance():
+    ref = small_run(ncore=1, nf_block=16)
+    ref = ref.phase(ref)
+    for ncore in [2, 3, 0]:
+        tsr = small_run(ncore=ncore, nf_block=16)
+        assert np.array_equal(tsr.phase(tsr), ref)
+
+
+def test_seed():
+    tsr = small_run()
+    ref = tsr.phase(tsr)
+    tsr.RandSeed = 1235
+    assert not np.any(tsr.phase(tsr) == ref)
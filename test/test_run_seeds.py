@@ -0,0 +1,54 @@
+"""
+Check that each output of tsrun.run_seeds matches a separate run with
+that RandSeed.
+
+Run this with pytest (from the repository root)::
+
+    python -m pytest test/
+"""
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import numpy as np
+import pyts.api as pyts
+
+seeds = [3, 8]
+
+
+def small_run(cohere, seed=1, **kwargs):
+    tsr = pyts.tsrun(RandSeed=seed, **kwargs)
+    tsr.grid = pyts.tsGrid(center=60, ny=4, nz=4, height=20., width=20.,
+                           time_sec=30, dt=0.1)
+    tsr.prof = pyts.profModels.pl(10, 60)
+    tsr.spec = pyts.specModels.nwtc.smooth(1., 0.1)
+    tsr.cohere = cohere()
+    tsr.stress = pyts.stressModels.uniform(-0.3, 0.1, 0)
+    return tsr
+
+
+def check_seeds(cohere, **kwargs):
+    multi = list(small_run(cohere, **kwargs).run_seeds(seeds))
+    assert len(multi) == len(seeds)
+    for dat, seed in zip(multi, seeds):
+        single = small_run(cohere, seed, **kwargs)()
+        assert dat.info['RandSeed'] == seed
+        # The coherence factors are applied to all seeds at once (as
+        # a matrix-matrix product), so they agree to float32 rounding.
+        assert np.allclose(dat.uturb, single.uturb, rtol=0, atol=1e-5)
+
+
+def test_nwtc():
+    check_seeds(lambda: pyts.cohereModels.nwtc())
+
+
+def test_iec_dense():
+    check_seeds(lambda: pyts.cohereModels.iec())
+
+
+def test_iec_circulant():
+    check_seeds(lambda: pyts.cohereModels.iec(method='circulant'))
+
+
+def test_iec_circulant_blocks():
+    check_seeds(lambda: pyts.cohereModels.iec(method='circulant'),
+                mem_limit='2MB')
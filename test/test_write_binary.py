@@ -0,0 +1,107 @@
+"""
+Check that the (time-chunked) .bts and .wnd writers produce the same
+files as the original (whole-array) writers.
+
+Run this with pytest (from the repository root)::
+
+    python -m pytest test/
+"""
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from struct import pack
+import numpy as np
+import pytest
+import pyts.api as pyts
+from pyts.io import write
+from pyts.io.base import e
+
+
+@pytest.fixture(scope='module')
+def tsdat():
+    tsr = pyts.tsrun(RandSeed=7)
+    tsr.grid = pyts.tsGrid(center=60, ny=5, nz=4, height=20., width=25.,
+                           time_sec=20, dt=0.1)
+    tsr.prof = pyts.profModels.pl(10, 60)
+    tsr.spec = pyts.specModels.nwtc.smooth(1., 0.1)
+    tsr.cohere = pyts.cohereModels.nwtc()
+    tsr.stress = pyts.stressModels.uniform(-0.3, 0.1, 0)
+    return tsr()
+
+
+@pytest.fixture(params=[write.chunk_bytes, 1000])
+def chunk_bytes(request, monkeypatch):
+    # The small value splits the data into many time-chunks.
+    monkeypatch.setattr(write, 'chunk_bytes', request.param)
+    return request.param
+
+
+def ref_bladed(tsdat):
+    # The original bladed writer (returns the file contents).
+    prms = tsdat.parameters
+    ts = tsdat.uturb + tsdat.uprof[..., None]
+    tke = (tsdat.uturb ** 2).mean(-1)
+    ti = np.sqrt(tke[:, tsdat.ihub[0], tsdat.ihub[1]]) / tsdat.UHUB
+    ti[ti < 1e-5] = 1
+    scale = 1000. / (tsdat.UHUB * ti[:, None, None, None])
+    off = np.array([1000. / (ti[0]), 0, 0])[:, None, None, None]
+    out = [pack(e + '2hl3f', -99, 4, 3,
+                prms.get('Latitude', 0.0), prms.get('Z0', 0.0),
+                tsdat.grid.z[0] + tsdat.grid.height / 2.0),
+           pack(e + '3f', * (100 * ti)),
+           pack(e + '3flf', tsdat.grid.dz, tsdat.grid.dy,
+                tsdat.UHUB * tsdat.dt, tsdat.shape[-1] / 2, tsdat.UHUB),
+           pack(e + '3f', *([0] * 3)),
+           pack(e + 'l', (tsdat.grid.clockwise + 1)),
+           pack(e + '3l', tsdat.info['RandSeed'],
+                tsdat.grid.n_z, tsdat.grid.n_y),
+           pack(e + '6l', *([0] * 6))]
+    if tsdat.grid.clockwise:
+        dat = (ts[:, :, ::-1, :] * scale - off).astype(np.int16)
+    else:
+        dat = (ts[:, :, :, :] * scale - off).astype(np.int16)
+    out.append(np.rollaxis(dat, 2, 1).tostring(order='F'))
+    return ''.join(out)
+
+
+def ref_turbsim(tsdat):
+    # The scale factors and data section of the original turbsim
+    # writer.
+    ts = tsdat.uturb + tsdat.uprof[..., None]
+    u_minmax = np.empty((3, 2), dtype=np.float32)
+    u_off = np.empty((3), dtype=np.float32)
+    u_scl = np.empty((3), dtype=np.float32)
+    out = np.empty(tsdat.shape, dtype=np.int16)
+    for ind in range(3):
+        u_minmax[ind] = ts[ind].min(), ts[ind].max()
+        if u_minmax[ind][0] == u_minmax[ind][1]:
+            u_scl[ind] = 1
+        else:
+            u_scl[ind] = 65536 / np.diff(u_minmax[ind])
+        u_off[ind] = -32768 - u_scl[ind] * u_minmax[ind, 0]
+        out[ind] = (ts[ind] * u_scl[ind] + u_off[ind]).astype(np.int16)
+    scl = pack(e + '6f', *np.array([u_scl, u_off]).T.flatten())
+    return scl, np.rollaxis(out, 2, 1).tostring(order='F')
+
+
+@pytest.mark.parametrize('clockwise', [True, False])
+def test_bladed(tsdat, chunk_bytes, clockwise, tmpdir):
+    tsdat.grid.clockwise = clockwise
+    fname = str(tmpdir.join('out.wnd'))
+    write.bladed(fname, tsdat)
+    with open(fname, 'rb') as fl:
+        dat = fl.read()
+    assert dat == ref_bladed(tsdat)
+
+
+def test_turbsim(tsdat, chunk_bytes, tmpdir):
+    fname = str(tmpdir.join('out.bts'))
+    write.turbsim(fname, tsdat)
+    with open(fname, 'rb') as fl:
+        dat = fl.read()
+    scl, data = ref_turbsim(tsdat)
+    # The scale factors are at bytes 42-66 of the header, which is
+    # followed by the description string (which contains the time).
+    assert dat[42:66] == scl
+    assert dat[66:70] == pack(e + 'l', len(dat) - 70 - len(data))
+    assert dat[-len(data):] == data
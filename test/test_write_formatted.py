@@ -0,0 +1,82 @@
+"""
+Check that the formatted (.u, .v, .w) writer produces the same files
+as the original (one timestep at a time) writer.
+
+Run this with pytest (from the repository root)::
+
+    python -m pytest test/
+"""
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import pytest
+import pyts.api as pyts
+from pyts.io import write
+
+
+@pytest.fixture(scope='module')
+def tsdat():
+    tsr = pyts.tsrun(RandSeed=7)
+    tsr.grid = pyts.tsGrid(center=60, ny=5, nz=4, height=20., width=25.,
+                           time_sec=20, dt=0.1)
+    tsr.prof = pyts.profModels.pl(10, 60)
+    tsr.spec = pyts.specModels.nwtc.smooth(1., 0.1)
+    tsr.cohere = pyts.cohereModels.nwtc()
+    tsr.stress = pyts.stressModels.uniform(-0.3, 0.1, 0)
+    return tsr()
+
+
+def ref_formatted(tsdat, idc):
+    # A component file of the original writer (without the time it
+    # was written).
+    header = ("\nThis full-field turbulence file was generated by ...")
+    header += ("\n\n"
+               " | %s-comp |  Y  x  Z  | Grid Resolution (Y x Z) | "
+               "Time-step | Hub Elev | Mean U |\n"
+               "          {n_y: 4d}  {n_z: 4d}  {dy: 9.3f}  {dz: 9.3f}   "
+               "   {dt:9.3f}  {zhub:9.2f} {uhub:9.2f}\n"
+               "\n"
+               " Z Coordinates (m):\n"
+               " {zcoords}\n"
+               "\n"
+               " Y Coordinates (m):\n"
+               " {ycoords}\n".format(n_y=tsdat.grid.n_y,
+                                     n_z=tsdat.grid.n_z,
+                                     dy=tsdat.grid.dy,
+                                     dz=tsdat.grid.dz,
+                                     dt=tsdat.dt,
+                                     zhub=tsdat.grid.zhub,
+                                     uhub=tsdat.UHUB,
+                                     zcoords=(' {: 7.3f}' * tsdat.grid.n_z).format(*tsdat.z),
+                                     ycoords=(' {: 7.3f}' * tsdat.grid.n_y).format(*tsdat.y), ))
+    outform = ("\n"
+               "  {: 7.3f} {: 7.3f}\n")
+    outform += (' ' + (' {: 7.3f}' * tsdat.grid.n_y) + '\n') * tsdat.grid.n_z
+    out = [header % tsdat.comp_name[idc]]
+    for idt in range(tsdat.time.shape[0]):
+        out.append(outform.format(tsdat.time[idt],
+                                  tsdat.uhub[idt],
+                                  *tsdat.uturb[idc, :, :, idt].flatten()))
+    return ''.join(out).split('\n')
+
+
+def read_comps(fname):
+    out = []
+    for comp in ['u', 'v', 'w']:
+        with open(fname + '.' + comp) as fl:
+            out.append(fl.read().split('\n'))
+    return out
+
+
+@pytest.mark.parametrize('nproc', [1, 3])
+@pytest.mark.parametrize('chunk_bytes', [write.chunk_bytes, 1000])
+def test_formatted(tsdat, nproc, chunk_bytes, monkeypatch, tmpdir):
+    # The small chunk_bytes writes a few timesteps at a time.
+    monkeypatch.setattr(write, 'chunk_bytes', chunk_bytes)
+    fname = str(tmpdir.join('step'))
+    write.formatted(fname + '.inp', tsdat, nproc=nproc)
+    for idc, lines in enumerate(read_comps(fname)):
+        ref = ref_formatted(tsdat, idc)
+        # The second line contains the time the file was written.
+        assert len(lines) == len(ref)
+        assert lines[:1] + lines[2:] == ref[:1] + ref[2:]